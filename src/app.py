@@ -1,18 +1,32 @@
 # Importing Libraries
 import os
-from io import StringIO, BytesIO
-import boto3
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+# These four stay eager: the data modules below import pandas and the worker loads the frame before serving,
+# the layout is built from dash_daq and dash_mantine_components, whose scripts must be registered before the first page
+import numpy as np
 import pandas as pd
 from datetime import timedelta
-import joblib
 import dash_daq as daq
-import plotly.express as px
 import dash_mantine_components as dmc
 from dash_iconify import DashIconify
-from dash import Dash, html, dcc, Input, Output
-from flask import Flask
-from flask_caching import Cache
+from dash import Dash, html, dcc, Input, Output, State, Patch, ClientsideFunction, no_update
+from dash.exceptions import PreventUpdate
+from flask import Flask, Response, request, stream_with_context
 from dotenv import load_dotenv
+from model_registry import ModelRegistry
+from final_store import FinalReader
+from inference import AQIPredictor
+from shared_cache import SharedDataCache
+from history_schema import compact_history, display_floats
+from push_channel import VersionBroadcaster
+from data_api import ResponseCache, ApiError, respond, error_response, latest_body, history_body, parse_limit
+from chart_data import time_window, downsample_series
+from metrics import timed, prometheus_metrics
+
+logger = logging.getLogger(__name__)
 
 # Loading Environment
 load_dotenv()
@@ -22,6 +36,36 @@ aws_region = "ap-south-1"
 for key, value in os.environ.items():
     globals()[key.lower()] = value
 
+# Default City, used when the data has it and otherwise the first city in the data
+default_city = os.environ.get("DEFAULT_CITY", "chandigarh")
+
+# Trend Chart Window and Point Budget
+chart_window_hours = int(os.environ.get("CHART_WINDOW_HOURS", 48))
+chart_point_budget = int(os.environ.get("CHART_POINT_BUDGET", 500))
+chart_incremental = os.environ.get("CHART_INCREMENTAL", "true").lower() == "true"
+
+# Forecast Horizon and Pollutant Sensitivity, the band is the forecast with every pollutant 20% lower and higher,
+# a sensitivity range to the inputs rather than a statistical uncertainty interval
+forecast_horizon = int(os.environ.get("FORECAST_HORIZON", 24))
+forecast_sensitivity = {"low": 0.8, "base": 1.0, "high": 1.2}
+forecast_pollutants = ["pm10", "pm2_5", "co", "no2", "o3", "so2"]
+
+# Version Push, the browser checks its pushed versions every tick and falls back to polling the server without a push connection
+push_check_interval = float(os.environ.get("PUSH_CHECK_INTERVAL", 1))
+push_heartbeat = int(os.environ.get("PUSH_HEARTBEAT", 15))
+push_max_streams = int(os.environ.get("PUSH_MAX_STREAMS", 8))
+push_fallback_ticks = 300
+
+# JSON API, how long proxies and clients may reuse a response before revalidating it
+api_max_age = int(os.environ.get("API_MAX_AGE", 60))
+
+# Warmup loads the model, data and default view before the server starts listening
+app_warmup = os.environ.get("APP_WARMUP", "false").lower() == "true"
+
+# Each worker waits this long at startup for the first data version, requests never load it themselves.
+# Kept well under the gunicorn worker timeout so a host with nothing published yet still boots
+data_start_timeout = int(os.environ.get("DATA_START_TIMEOUT", 10))
+
 # Image Folder
 image_folder = "https://github-projects-resume.s3.ap-south-1.amazonaws.com/Real_Time_Analytical_Dashboard/resources/"
 
@@ -30,49 +74,192 @@ image_folder = "https://github-projects-resume.s3.ap-south-1.amazonaws.com/Real_
 server = Flask(__name__)
 app = Dash(__name__, server=server, external_stylesheets=["https://fonts.googleapis.com/css2?family=Poppins:wght@200;300;400;500;600;700&display=swap"])
 app.title = "AQI Dashboard"
-cache = Cache(app.server, config={"CACHE_TYPE": "SimpleCache",  "CACHE_DEFAULT_TIMEOUT": 300})
-
 
-# Load ML Model
-def get_ml_prediction(independent_variables):
-    file_location = "s3://github-projects-resume/Real_Time_Analytical_Dashboard/resources/aqi_ml_model.pkl"
-    bucket_name = file_location.split("/")[2]
-    key = "/".join(file_location.split("/")[3:])
+# Stage Timings as Prometheus Histograms and Counters, METRICS_ENABLED=false leaves the endpoint out
+metrics_exposition = prometheus_metrics()
+if metrics_exposition is not None:
+    @server.route("/metrics")
+    def metrics_endpoint():
+        body, content_type = metrics_exposition()
+        return Response(body, content_type=content_type)
 
-    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
-                             aws_secret_access_key=aws_secret_access_key)
 
-    obj = s3_client.get_object(Bucket=bucket_name, Key=key)
-    model_bytes = BytesIO(obj["Body"].read())
-    model = joblib.load(model_bytes)
-
-    prediction = model.predict(independent_variables)[0]
-    return prediction
+# Load ML Model
+model_registry = ModelRegistry(
+    "s3://github-projects-resume/Real_Time_Analytical_Dashboard/resources/aqi_ml_model.ubj",
+    AQIPredictor.from_bytes,
+    s3_client_kwargs={"region_name": aws_region, "aws_access_key_id": aws_access_key_id, "aws_secret_access_key": aws_secret_access_key},
+    poll_interval=int(os.environ.get("MODEL_POLL_INTERVAL", 300))
+).start(wait=app_warmup)
 
 # Reading Data from s3
-@cache.memoize()
-def get_data():
-    s3_data_path = "s3://github-projects-resume/Real_Time_Analytical_Dashboard/data/final/output.csv"
-    bucket_name = s3_data_path.split("/")[2]
-    file_key = "/".join(s3_data_path.split("/")[3:])
-
-    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
-                             aws_secret_access_key=aws_secret_access_key)
+final_reader = FinalReader(
+    "s3://github-projects-resume/Real_Time_Analytical_Dashboard/data/final",
+    s3_client_kwargs={"region_name": aws_region, "aws_access_key_id": aws_access_key_id, "aws_secret_access_key": aws_secret_access_key}
+)
 
-    response = s3_client.get_object(Bucket=bucket_name, Key=file_key)
-    csv_content = response['Body'].read().decode('utf-8')
-    df = pd.read_csv(StringIO(csv_content))
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=False)
-    df = df.drop_duplicates("timestamp", keep="first")
-    return df
+# One refresher per host loads new versions from s3 into a shared Arrow file read by every worker,
+# in the compact history schema so each worker maps a third of the float64 and object frame.
+# The schema conversion runs once per final version, not on every refresh tick
+compacted_final = (None, None)
+
+@timed("load_final_data")
+def load_final_data():
+    global compacted_final
+    df = final_reader.read()
+    if df is None:
+        return None, None
+    if compacted_final[0] != final_reader.version:
+        compacted_final = (final_reader.version, compact_history(df))
+    return compacted_final[1], compacted_final[0]
+
+data_cache = SharedDataCache(
+    load_final_data,
+    os.environ.get("DATA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "aqi_dashboard")),
+    refresh_interval=int(os.environ.get("DATA_REFRESH_INTERVAL", 60))
+).start(wait=True, timeout=data_start_timeout)
+
+@timed("get_data")
+def get_data():
+    return data_cache.get()
+
+
+# Multi Horizon Forecast
+# Every city and sensitivity level is forecast together once per data and model version, shared by all workers
+def build_forecasts(df, predictor):
+    latest = df.sort_values(["city", "timestamp"]).groupby("city").tail(3)
+    latest = latest[latest.groupby("city")["city"].transform("size") == 3]
+    if latest.empty:
+        return None
+
+    last_readings = latest.groupby("city").tail(1)
+    aqi_lags = latest["aqi_in"].to_numpy(dtype="float32").reshape(-1, 3)[:, ::-1]
+    factors = np.repeat(list(forecast_sensitivity.values()), len(last_readings))
+
+    predictions = predictor.forecast(
+        {p: np.tile(last_readings[p].to_numpy(dtype="float32"), len(forecast_sensitivity)) * factors for p in forecast_pollutants},
+        np.tile(aqi_lags, (len(forecast_sensitivity), 1)),
+        np.tile(last_readings["timestamp"].to_numpy(), len(forecast_sensitivity)),
+        horizon=forecast_horizon
+    ).reshape(len(forecast_sensitivity), len(last_readings), forecast_horizon)
+
+    # Forecast at the measured levels, with the spread over the sensitivity levels as the band
+    base = predictions[list(forecast_sensitivity).index("base")]
+    timestamps = pd.DatetimeIndex(last_readings["timestamp"])
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_localize(None)
+    steps = np.arange(1, forecast_horizon + 1)
+    return pd.DataFrame({
+        "city": np.repeat(last_readings["city"].to_numpy(), forecast_horizon),
+        "step": np.tile(steps, len(last_readings)),
+        "timestamp": (timestamps.to_numpy()[:, None] + steps * np.timedelta64(1, "h")).ravel(),
+        "aqi": base.ravel(),
+        "aqi_low": predictions.min(axis=0).ravel(),
+        "aqi_high": predictions.max(axis=0).ravel()
+    })
+
+def forecast_version():
+    # From the published data version and the model version alone, so an unchanged pair skips the forecast
+    data_version = data_cache.peek_version()
+    predictor, model_version = model_registry.snapshot()
+    if data_version is None or predictor is None:
+        return None
+    return f"{data_version}:{model_version}"
+
+@timed("load_forecasts")
+def load_forecasts():
+    df, data_version = data_cache.snapshot()
+    predictor, model_version = model_registry.snapshot()
+    if df is None or predictor is None:
+        return None, None
+    return build_forecasts(df, predictor), f"{data_version}:{model_version}"
+
+forecast_cache = SharedDataCache(
+    load_forecasts,
+    os.environ.get("DATA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "aqi_dashboard")),
+    name="forecast",
+    refresh_interval=int(os.environ.get("DATA_REFRESH_INTERVAL", 60)),
+    version_source=forecast_version
+).start()
+
+
+# Pushing New Versions
+# Streams hold a thread each, so the server runs threaded workers (gunicorn --worker-class gthread).
+# PUSH_MAX_STREAMS is kept well below the worker's threads, past it clients get a 503 and poll instead,
+# so open streams never take the threads callbacks, the API and /metrics are served from
+version_broadcaster = VersionBroadcaster(
+    {"data": data_cache.peek_version, "forecast": forecast_cache.peek_version},
+    check_interval=push_check_interval,
+    heartbeat=push_heartbeat,
+    max_streams=push_max_streams
+).start()
+
+@server.route("/events")
+def version_events():
+    if not version_broadcaster.reserve_stream():
+        return Response("Too many open streams", status=503, headers={"Retry-After": "60", "Cache-Control": "no-cache"})
+
+    # The slot is given back when the server closes the response, including when the client went away
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    response = Response(stream_with_context(version_broadcaster.stream()), content_type="text/event-stream", headers=headers)
+    response.call_on_close(version_broadcaster.release_stream)
+    return response
+
+
+# JSON API
+# Served from the same frame as the dashboard, cacheable by nginx and downstream consumers
+api_cache = ResponseCache()
+
+@server.route("/api/latest")
+def api_latest():
+    df, data_version = data_cache.snapshot()
+    if df is None:
+        return error_response("No data published yet", 503)
+    return respond(request, api_cache, (data_version, "latest"), lambda: latest_body(df, data_version), api_max_age)
+
+@server.route("/api/history")
+def api_history():
+    df, data_version = data_cache.snapshot()
+    if df is None:
+        return error_response("No data published yet", 503)
+    args = request.args
+    query = (args.get("city"), args.get("from"), args.get("to"), args.get("cursor"))
+    try:
+        limit = parse_limit(args.get("limit"))
+        return respond(request, api_cache, (data_version, "history", *query, limit), lambda: history_body(df, data_version, *query, limit), api_max_age)
+    except ApiError as e:
+        return error_response(str(e))
+
+
+# City Options
+def city_options(df):
+    if df is None:
+        return []
+    return [{"value": city, "label": city.replace("_", " ").title() + " AQI"} for city in sorted(df["city"].unique())]
+
+
+def pick_city(options, city=None):
+    cities = [option["value"] for option in options]
+    if city in cities:
+        return city
+    if default_city in cities:
+        return default_city
+    return cities[0] if cities else None
 
 
 # Defining Layout
+initial_city_options = city_options(get_data())
+
 app.layout = dmc.MantineProvider(
     children = html.Div(className="main_layout", children=[
-        dcc.Interval(id="time_interval", interval=300000),
+        dcc.Interval(id="push_interval", interval=int(push_check_interval * 1000)),
+        dcc.Store(id="push_fallback_ticks", data=push_fallback_ticks),
+        dcc.Store(id="data_version"),
+        dcc.Store(id="forecast_version"),
+        dcc.Store(id="aqi_line_chart_state"),
         html.Div(className="header", children=[
-            dmc.Text("Chandigarh AQI", className="header_text"),
+            dmc.Select(id="city_select", className="header_text header_city_select", variant="unstyled", value=pick_city(initial_city_options),
+                       data=initial_city_options),
             html.Div(className="header_measure", children=[DashIconify(icon="fluent:temperature-16-filled", color="white", width=25), html.P(id="header_temperature")]),
             html.Div(className="header_measure", children=[DashIconify(icon="carbon:humidity", color="white", width=25), html.P(id="header_humidity")]),
             html.Div(className="header_measure", children=[DashIconify(icon="tabler:uv-index", color="white", width=25), html.P(id="header_uv")]),
@@ -181,20 +368,72 @@ app.layout = dmc.MantineProvider(
 )
 
 
-# Updating AQI Line Chart
+# Receiving Pushed Versions, in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace="aqi_push", function_name="versions"),
+    [Output("data_version", "data"), Output("forecast_version", "data")],
+    Input("push_interval", "n_intervals"),
+    [State("push_fallback_ticks", "data"), State("data_version", "data"), State("forecast_version", "data")]
+)
+
+
+# Updating City Options
+# The selection moves to the default city when the selected one is not in the data
 @app.callback(
-    Output("aqi_line_chart", "figure"),
-    Input("time_interval", "n_intervals")
+    [Output("city_select", "data"), Output("city_select", "value")],
+    Input("data_version", "data"),
+    State("city_select", "value")
 )
-def update_aqi_line_chart(time_interval):
-    df = get_data()
+@timed("callback.update_city_options")
+def update_city_options(data_version, city):
+    options = city_options(get_data())
+    if not options:
+        raise PreventUpdate
+    selected = pick_city(options, city)
+    return options, selected if selected != city else no_update
+
 
-    max_time = df["timestamp"].max()
-    min_time = max_time - timedelta(hours=48)
-    aqi_chart = px.line(df, x="timestamp", y=["aqi_in", "aqi_us"], template="plotly_white", range_x=[min_time, max_time])
+# Building Dashboard Outputs
+def build_aqi_chart_series(df):
+    # Only the visible window is sent, as IST wall clock time
+    series = time_window(df, chart_window_hours)[["timestamp", "aqi_in", "aqi_us"]].copy()
+    if series["timestamp"].dt.tz is not None:
+        series["timestamp"] = series["timestamp"].dt.tz_localize(None)
+    return series
 
+
+def build_aqi_chart_range(series, forecast):
+    max_time = series["timestamp"].max()
+    end_time = forecast["timestamp"].max() if forecast is not None and not forecast.empty else max_time
+    return [max_time - timedelta(hours=chart_window_hours), end_time]
+
+
+forecast_trace_names = ["forecast_high", "forecast_low", "forecast"]
+
+def build_aqi_forecast_traces(forecast):
+    # Band upper edge, band lower edge filled to it, then the forecast line
+    if forecast is None:
+        forecast = pd.DataFrame(columns=["timestamp", "aqi", "aqi_low", "aqi_high"])
+    x = forecast["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%S").tolist() if not forecast.empty else []
+    return [
+        {"x": x, "y": forecast["aqi_high"].round(1).tolist()},
+        {"x": x, "y": forecast["aqi_low"].round(1).tolist()},
+        {"x": x, "y": forecast["aqi"].round(1).tolist()}
+    ]
+
+
+def build_aqi_line_chart(series, forecast):
+    # plotly express pulls in most of plotly, it is imported with the first chart rather than at startup
+    import plotly.express as px
+
+    chart_df = downsample_series(series, "timestamp", ["aqi_in", "aqi_us"], chart_point_budget)
+    aqi_chart = px.line(chart_df, x="timestamp", y="value", color="variable", template="plotly_white", range_x=build_aqi_chart_range(series, forecast))
+
+    # Trace positions by series, a series without readings in the window has no trace
+    traces = {}
     custom_names = {"aqi_in": "INDIA Standard   ", "aqi_us": "US Standard   "}
-    for trace in aqi_chart.data:
+    for trace_index, trace in enumerate(aqi_chart.data):
+        traces[trace.name] = trace_index
         trace.name = custom_names.get(trace.name, trace.name)
 
     aqi_chart.update_layout(autosize=True, margin=dict(l=0, r=25, b=0))
@@ -210,23 +449,19 @@ def update_aqi_line_chart(time_interval):
     # Hover Label
     aqi_chart.update_layout(hovermode="x unified", hoverlabel=dict(bgcolor="#c1dfff", font_size=12, font_family="Poppins", align="left"))
     aqi_chart.update_traces(hovertemplate="AQI Count: <b>%{y}</b><extra></extra>")
-    return aqi_chart
 
+    # Forecast Sensitivity Band
+    band_high, band_low, forecast_line = build_aqi_forecast_traces(forecast)
+    aqi_chart.add_scatter(**band_high, mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip")
+    aqi_chart.add_scatter(**band_low, mode="lines", name="Pollutants ±20%   ", line=dict(width=0), fill="tonexty", fillcolor="rgba(5, 47, 95, 0.15)", hoverinfo="skip")
+    aqi_chart.add_scatter(**forecast_line, mode="lines", name="Forecast   ", line=dict(width=2, dash="dash", color="#052F5F"),
+                          hovertemplate="Forecast AQI: <b>%{y:.0f}</b><extra></extra>")
+    traces.update({name: len(aqi_chart.data) - 3 + i for i, name in enumerate(forecast_trace_names)})
+    return aqi_chart, int(chart_df.groupby("variable").size().max()), traces
 
-# Updating AQI Measures
-@app.callback(
-    [Output("header_date", "children"), Output("aqi_reading_count_actual", "children"),
-     Output("pm25_gauge", "value"), Output("pm10_gauge", "value"),
-     Output("so2_gauge", "value"), Output("co_gauge", "value"),
-     Output("o3_gauge", "value"), Output("no2_gauge", "value"),
-     Output("header_temperature", "children"), Output("header_humidity", "children"),
-     Output("header_uv", "children"), Output("header_wind", "children"),
-    Output("header_wind_direction", "style")],
-    Input("time_interval", "n_intervals")
-)
-def update_aqi_measures(time_interval):
-    df = get_data()
-    measures = df.iloc[-1]
+
+def build_aqi_measures(df):
+    measures = display_floats(df.iloc[[-1]]).iloc[0]
 
     aqi = measures["aqi_24"]
     time_received = "Last Update (IST):\n" + measures["timestamp"].strftime("%d %B %Y, %I:%M %p")
@@ -250,15 +485,7 @@ def update_aqi_measures(time_interval):
     return time_received, aqi, int(measures["pm2_5"]), int(measures["pm10"]), int(measures["so2"]), measures["co"], int(measures["o3"]), int(measures["no2"]), temperature, humidity, uv, wind, wind_degree
 
 
-# Updating AQI Prominent Pollutant Flag
-@app.callback(
-    [Output("aqi_measure_flag_pm25", "style"), Output("aqi_measure_flag_pm10", "style"),
-    Output("aqi_measure_flag_so2", "style"), Output("aqi_measure_flag_co", "style"),
-    Output("aqi_measure_flag_o3", "style"), Output("aqi_measure_flag_no2", "style")],
-    Input("time_interval", "n_intervals")
-)
-def update_prominent_pollutant_flag(time_interval):
-    df = get_data()
+def build_prominent_pollutant_flag(df):
     prominent_pollutant = df.iloc[-1]["prominent_pollutant"]
 
     hidden = {"display": "none"}
@@ -273,39 +500,158 @@ def update_prominent_pollutant_flag(time_interval):
     return styles
 
 
+def build_aqi_predicted_count(forecast):
+    if forecast is None or forecast.empty:
+        return "-"
+
+    predicted_aqi = round(float(forecast.loc[forecast["step"] == 1, "aqi"].iloc[0]))
+    return predicted_aqi
+
+
+# View Model per Data Version
+# Every output is computed once per data version, forecast version and city, then shared by all clients
+view_models = OrderedDict()
+view_models_lock = threading.Lock()
+view_models_size = 64
+
+def get_view_model(city):
+    df, data_version = data_cache.snapshot()
+    # Still initializing, the page keeps its current outputs until the first version is published
+    if df is None:
+        raise PreventUpdate
+    forecasts, forecast_version = forecast_cache.snapshot()
+    key = (data_version, forecast_version, city)
+
+    view_model = view_models.get(key)
+    if view_model is None:
+        with view_models_lock:
+            view_model = view_models.get(key)
+            if view_model is None:
+                city_df = df[df["city"] == city]
+                # A city missing from the data keeps the page as it is until the selection moves
+                if city_df.empty:
+                    raise PreventUpdate
+                city_forecast = forecasts[forecasts["city"] == city] if forecasts is not None else None
+                chart_series = build_aqi_chart_series(city_df)
+                chart, chart_points, chart_traces = build_aqi_line_chart(chart_series, city_forecast)
+                view_model = {
+                    "chart": chart,
+                    "chart_points": chart_points,
+                    "chart_traces": chart_traces,
+                    "chart_series": chart_series,
+                    "chart_forecast": city_forecast,
+                    "forecast_version": forecast_version,
+                    "measures": build_aqi_measures(city_df),
+                    "flags": build_prominent_pollutant_flag(city_df),
+                    "forecast": build_aqi_predicted_count(city_forecast)
+                }
+                view_models[key] = view_model
+                while len(view_models) > view_models_size:
+                    view_models.popitem(last=False)
+    return view_model
+
+
+# Updating AQI Line Chart
+@app.callback(
+    [Output("aqi_line_chart", "figure"), Output("aqi_line_chart_state", "data")],
+    [Input("data_version", "data"), Input("forecast_version", "data"), Input("city_select", "value")],
+    State("aqi_line_chart_state", "data")
+)
+@timed("callback.update_aqi_line_chart")
+def update_aqi_line_chart(data_version, forecast_version, city, chart_state):
+    view_model = get_view_model(city)
+    series = view_model["chart_series"]
+    forecast = view_model["chart_forecast"]
+    max_time = series["timestamp"].max()
+    new_state = {"city": city, "last_timestamp": max_time.isoformat(), "forecast_version": view_model["forecast_version"]}
+
+    # Append only the readings this client has not drawn yet, redrawing once the figure outgrows the budget.
+    # The client's figure is patched at the trace positions it was drawn with, kept in its chart state
+    if chart_incremental and chart_state and chart_state["city"] == city and chart_state["points"] < 2 * chart_point_budget and chart_state.get("traces"):
+        traces = chart_state["traces"]
+        new_rows = series[series["timestamp"] > pd.Timestamp(chart_state["last_timestamp"])]
+        if new_rows.empty and chart_state.get("forecast_version") == view_model["forecast_version"]:
+            return no_update, no_update
+
+        # A series that had no trace when the figure was drawn needs a full redraw
+        if all(column in traces or new_rows[column].isna().all() for column in ["aqi_in", "aqi_us"]):
+            aqi_chart = Patch()
+            for column in ["aqi_in", "aqi_us"]:
+                if column not in traces:
+                    continue
+                rows = new_rows.dropna(subset=[column])
+                aqi_chart["data"][traces[column]]["x"].extend(rows["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%S").tolist())
+                aqi_chart["data"][traces[column]]["y"].extend(rows[column].tolist())
+
+            # The forecast traces are small and replaced whole
+            for name, trace in zip(forecast_trace_names, build_aqi_forecast_traces(forecast)):
+                aqi_chart["data"][traces[name]]["x"] = trace["x"]
+                aqi_chart["data"][traces[name]]["y"] = trace["y"]
+            aqi_chart["layout"]["xaxis"]["range"] = [t.isoformat() for t in build_aqi_chart_range(series, forecast)]
+            return aqi_chart, {**new_state, "traces": traces, "points": chart_state["points"] + len(new_rows)}
+
+    return view_model["chart"], {**new_state, "traces": view_model["chart_traces"], "points": view_model["chart_points"]}
+
+
+# Updating AQI Measures
+@app.callback(
+    [Output("header_date", "children"), Output("aqi_reading_count_actual", "children"),
+     Output("pm25_gauge", "value"), Output("pm10_gauge", "value"),
+     Output("so2_gauge", "value"), Output("co_gauge", "value"),
+     Output("o3_gauge", "value"), Output("no2_gauge", "value"),
+     Output("header_temperature", "children"), Output("header_humidity", "children"),
+     Output("header_uv", "children"), Output("header_wind", "children"),
+    Output("header_wind_direction", "style")],
+    [Input("data_version", "data"), Input("city_select", "value")]
+)
+@timed("callback.update_aqi_measures")
+def update_aqi_measures(data_version, city):
+    return get_view_model(city)["measures"]
+
+
+# Updating AQI Prominent Pollutant Flag
+@app.callback(
+    [Output("aqi_measure_flag_pm25", "style"), Output("aqi_measure_flag_pm10", "style"),
+    Output("aqi_measure_flag_so2", "style"), Output("aqi_measure_flag_co", "style"),
+    Output("aqi_measure_flag_o3", "style"), Output("aqi_measure_flag_no2", "style")],
+    [Input("data_version", "data"), Input("city_select", "value")]
+)
+@timed("callback.update_prominent_pollutant_flag")
+def update_prominent_pollutant_flag(data_version, city):
+    return get_view_model(city)["flags"]
+
+
 # Updating AQI Predicted Value
 @app.callback(
     Output("aqi_reading_count_predicted", "children"),
-    Input("time_interval", "n_intervals")
+    [Input("forecast_version", "data"), Input("city_select", "value")]
 )
-def update_aqi_predicted_count(time_interval):
-    df = get_data()
-    df = df.tail(4)
-
-    df["month"] = df["timestamp"].dt.month
-    df["day"] = df["timestamp"].dt.day
-    df["hour"] = df["timestamp"].dt.hour
-
-    latest_reading = df.iloc[-1]
-    independent_variables = pd.DataFrame([{
-        "pm10": latest_reading["pm10"],
-        "pm2_5": latest_reading["pm2_5"],
-        "co": latest_reading["co"],
-        "no2": latest_reading["no2"],
-        "o3": latest_reading["o3"],
-        "so2": latest_reading["so2"],
-        "month": latest_reading["month"],
-        "day": latest_reading["day"],
-        "hour": latest_reading["hour"],
-        "aqi_lag1": df.iloc[-1]["aqi_in"],
-        "aqi_lag2": df.iloc[-2]["aqi_in"],
-        "aqi_lag3": df.iloc[-3]["aqi_in"]
-    }])
-
-    predicted_aqi = round(get_ml_prediction(independent_variables))
-    return predicted_aqi
+@timed("callback.update_aqi_predicted_count")
+def update_aqi_predicted_count(forecast_version, city):
+    return get_view_model(city)["forecast"]
+
+
+# Warmup
+# Every worker finishes this before it accepts requests, so the first visitor after a cold start is served from memory
+@timed("warmup")
+def warmup():
+    try:
+        city = pick_city(city_options(get_data()))
+        if model_registry.model is not None:
+            forecast_cache.wait_published(data_start_timeout)
+        get_view_model(city)
+
+        # Dash builds its index and callback list on the first request
+        client = server.test_client()
+        for path in ["/", "/_dash-layout", "/_dash-dependencies"]:
+            client.get(path)
+    except Exception:
+        logger.exception("Warmup failed, serving cold")
+
+if app_warmup:
+    warmup()
 
 
 # Running Main App
 if __name__ == "__main__":
-    app.run(debug=False, host="0.0.0.0", port=8000)
+    app.run(debug=False, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
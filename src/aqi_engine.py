@@ -0,0 +1,61 @@
+# Importing Libraries
+import numpy as np
+import pandas as pd
+
+# Pollutants Scored by CPCB
+pollutant_keys = ["pm2_5", "pm10", "so2", "co", "o3", "no2"]
+
+
+# Compile Breakpoints into sorted per Pollutant Arrays
+def compile_breakpoints(breakpoint_df):
+    breakpoints = {}
+    for pollutant_key, pollutant_df in breakpoint_df.groupby("pollutant", sort=False):
+        pollutant_df = pollutant_df.sort_values(["low_concentration", "upper_concentration"], kind="stable")
+        breakpoints[pollutant_key] = {
+            "c_low": pollutant_df["low_concentration"].to_numpy(dtype="float64"),
+            "c_high": pollutant_df["upper_concentration"].to_numpy(dtype="float64"),
+            "i_low": pollutant_df["low_aqi"].to_numpy(dtype="float64"),
+            "i_high": pollutant_df["upper_aqi"].to_numpy(dtype="float64")
+        }
+    return breakpoints
+
+
+def load_breakpoints(path):
+    return compile_breakpoints(pd.read_csv(path))
+
+
+# Sub Index for a whole Column at once
+def pollutant_sub_index(values, pollutant_breakpoints, rounding="ceil"):
+    values = np.asarray(values, dtype="float64")
+    lookup_values = np.ceil(values) if rounding == "ceil" else np.round(values)
+
+    # First band whose upper limit covers the value, clipped to the first and last band
+    index = np.searchsorted(pollutant_breakpoints["c_high"], lookup_values, side="left")
+    index = np.clip(index, 0, len(pollutant_breakpoints["c_high"]) - 1)
+
+    c_low = pollutant_breakpoints["c_low"][index]
+    c_high = pollutant_breakpoints["c_high"][index]
+    i_low = pollutant_breakpoints["i_low"][index]
+    i_high = pollutant_breakpoints["i_high"][index]
+    return ((i_high - i_low) / (c_high - c_low)) * (values - c_low) + i_low
+
+
+# AQI and Dominant Pollutant for every Row
+def score_aqi(df, breakpoints, pollutants=None, rounding="ceil"):
+    if pollutants is None:
+        pollutants = [p for p in df.columns if p in breakpoints]
+
+    sub_indices = np.column_stack([
+        pollutant_sub_index(df[pollutant_key].to_numpy(), breakpoints[pollutant_key], rounding)
+        for pollutant_key in pollutants
+    ])
+    sub_indices = np.nan_to_num(sub_indices, nan=-np.inf)
+
+    dominant_index = np.argmax(sub_indices, axis=1)
+    aqi = sub_indices[np.arange(len(sub_indices)), dominant_index]
+
+    # Rows where no pollutant scores above zero have no dominant pollutant
+    scored = aqi > 0
+    aqi = np.where(scored, aqi, 0.0)
+    prominent_pollutant = np.where(scored, np.asarray(pollutants, dtype=object)[dominant_index], "")
+    return aqi, prominent_pollutant
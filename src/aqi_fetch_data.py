@@ -1,14 +1,28 @@
 # Importing Libraries
-import os, io, re, math
-import json, time
+import os, io, re
+import json
+import time
+import logging
+import random
 import boto3
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import s3fs
 import pandas as pd
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone
+from html.parser import HTMLParser
+from datetime import datetime, timezone, timedelta
 import pytz
 from dotenv import load_dotenv
+from aqi_engine import load_breakpoints, score_aqi
+from final_store import publish_final
+from cpcb_aggregator import CPCBAggregator
+from metrics import span, timed, add_observer, log_observer
+from storage_config import aws_region, s3_path, raw_data_path, final_data_path, working_data_path, history_file, manifest_file
+from storage_config import aggregator_file, pollutant_breakpoints, city_registry, default_city, load_cities
+from raw_store import part_prefix, read_raw_range
+
+logger = logging.getLogger(__name__)
 
 # Load .env file
 pd.set_option('display.max_columns', None)
@@ -17,57 +31,48 @@ pd.set_option('display.max_colwidth', None)
 load_dotenv()
 
 # Credentials
-aws_region = "ap-south-1"
 for key, value in os.environ.items():
     globals()[key.lower()] = value
 
-# s3 Location
-s3_path = "s3://github-projects-resume/Real_Time_Analytical_Dashboard"
-raw_data_path = f"{s3_path}/data/raw"
-final_data_path = f"{s3_path}/data/final"
-pollutant_breakpoints = f"{s3_path}/resources/aqi_concentration_breakpoints.csv"
+# Cities fetched in parallel per run, each city fetches its own sources concurrently
+city_concurrency = int(os.environ.get("CITY_CONCURRENCY", 8))
+
+# Data Sources
+aqi_in_url = "https://airquality.googleapis.com/v1/currentConditions:lookup"
+aqi_us_url = "https://www.aqi.in/in/dashboard"
+weather_url = "http://api.weatherapi.com/v1/current.json"
+# Seconds per source, looked up on every call
+source_timeouts = {"aqi_in": 10, "aqi_us": 8, "weather": 8}
+
+# AQI US Scrape, validators of the last good page per url and retries with full jitter inside the source timeout
+aqi_us_validators = {}
+aqi_us_retry_statuses = {429, 500, 502, 503, 504}
+aqi_us_backoff = {"base": 0.25, "cap": 4.0}
+
+# Pooled HTTP Session shared by all Sources
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=3 * city_concurrency))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=3 * city_concurrency))
 
 # Molecular Weights
 molecular_weights = {"pm25": 0, "pm10": 0, "no2": 46.01, "so2": 64.07, "co": 28.01, "o3": 48.00}
 
-def calculate_aqi(df, breakpoint_df):
-    aqi_breakpoint = 0
-    prominent_pollutant = ""
-    
-    for pollutant_key in df.columns:
-        pollutant_value = math.ceil(df[pollutant_key].iloc[0])
-        breakpoint_pollutant_df = breakpoint_df[breakpoint_df["pollutant"] == pollutant_key]
-
-        if pollutant_value < breakpoint_pollutant_df["low_concentration"].min():
-            breakpoint_row = breakpoint_pollutant_df.iloc[0]
-        elif pollutant_value > breakpoint_pollutant_df["upper_concentration"].max():
-            breakpoint_row = breakpoint_pollutant_df.iloc[-1]
-        else:
-            breakpoint_row = breakpoint_pollutant_df[
-                (breakpoint_pollutant_df["low_concentration"] <= pollutant_value) &
-                (breakpoint_pollutant_df["upper_concentration"] >= pollutant_value)
-                ].iloc[0]
-
-        c_low = breakpoint_row['low_concentration']
-        c_high = breakpoint_row['upper_concentration']
-        i_low = breakpoint_row['low_aqi']
-        i_high = breakpoint_row['upper_aqi']
-
-        aqi = ((i_high - i_low) / (c_high - c_low)) * (df[pollutant_key].iloc[0] - c_low) + i_low
-        if aqi > aqi_breakpoint:
-            aqi_breakpoint = int(round(aqi))
-            prominent_pollutant = pollutant_key
-    return aqi_breakpoint, prominent_pollutant
-
-
-def get_aqi_in(breakpoint_df):
-    url = f"https://airquality.googleapis.com/v1/currentConditions:lookup?key={google_api_key}"
+def calculate_aqi(df, breakpoints):
+    aqi, prominent_pollutant = score_aqi(df, breakpoints, rounding="ceil")
+    return int(round(aqi[0])), prominent_pollutant[0]
+
+
+@timed("fetch.aqi_in")
+def get_aqi_in(breakpoints, city, session=http_session, timeout=None):
+    timeout = timeout or source_timeouts["aqi_in"]
+    url = f"{aqi_in_url}?key={google_api_key}"
     headers = {"Content-Type": "application/json"}
     payload = {
-        "universalAqi": False, "location": {"latitude": lat, "longitude": lon}, "extraComputations": ["POLLUTANT_CONCENTRATION"]
+        "universalAqi": False, "location": {"latitude": city["latitude"], "longitude": city["longitude"]}, "extraComputations": ["POLLUTANT_CONCENTRATION"]
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = session.post(url, json=payload, headers=headers, timeout=timeout)
+    response.raise_for_status()
     aqi_data = response.json()
 
     current_time = datetime.strptime(aqi_data["dateTime"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).astimezone(pytz.timezone("Asia/Kolkata"))
@@ -88,35 +93,104 @@ def get_aqi_in(breakpoint_df):
     o3 = pollutant_concentrations.get("o3", 0)
 
     df = pd.DataFrame([{"pm2_5": pm2_5, "pm10": pm10, "so2": so2, "co": co, "o3": o3, "no2": no2}])
-    aqi_in, prominent_pollutant = calculate_aqi(df, breakpoint_df)
+    aqi_in, prominent_pollutant = calculate_aqi(df, breakpoints)
     return current_time, aqi_in, pm2_5, pm10, so2, co, o3, no2, prominent_pollutant
 
 
-def get_aqi_us():
-    try_count = 0
-    while try_count < 1:
+# Reads only up to the aqi-value block, the first span in it holding a number is the AQI
+class AQIValueParser(HTMLParser):
+    value_class = re.compile(".*aqi-value.*")
+
+    def __init__(self):
+        super().__init__()
+        self.value = None
+        self.finished = False
+        self.div_depth = 0
+        self.span_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self.div_depth:
+                self.div_depth += 1
+            elif self.value_class.match(dict(attrs).get("class") or ""):
+                self.div_depth = 1
+        elif tag == "span" and self.div_depth:
+            self.span_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self.span_depth:
+            self.span_depth -= 1
+        elif tag == "div" and self.div_depth:
+            self.div_depth -= 1
+            self.finished = self.div_depth == 0
+
+    def handle_data(self, data):
+        if self.span_depth and self.value is None and data.strip().isdigit():
+            self.value = int(data.strip())
+            self.finished = True
+
+
+def parse_aqi_us(chunks, deadline=None):
+    parser = AQIValueParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.finished or (deadline is not None and time.monotonic() > deadline):
+            break
+    return parser.value
+
+
+@timed("fetch.aqi_us")
+def get_aqi_us(city, session=http_session, timeout=None):
+    url = f"{aqi_us_url}/{city['aqi_us_path']}"
+    deadline = time.monotonic() + (timeout or source_timeouts["aqi_us"])
+    cached = aqi_us_validators.get(url)
+
+    attempt = 0
+    while True:
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if cached is not None and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
         try:
-            url = "https://www.aqi.in/in/dashboard/india/chandigarh"
-            response = requests.get(url, headers = {"User-Agent": "Mozilla/5.0"})
-            html_content = response.text
-            soup = BeautifulSoup(html_content, "html.parser")
-
-            aqi_div = soup.find("div", class_=re.compile(".*aqi-value.*"))
-            for span in aqi_div.find_all("span"):
-                aqi_us = span.find(string=True, recursive=False).strip()
-                if aqi_us.isdigit():
-                    aqi_us = int(aqi_us)
-                    break
-            return aqi_us
+            # Streamed so the download stops as soon as the value has been parsed
+            with session.get(url, headers=headers, timeout=max(deadline - time.monotonic(), 0.1), stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    return cached["value"]
+                if response.status_code not in aqi_us_retry_statuses:
+                    response.raise_for_status()
+                    response.encoding = response.encoding or "utf-8"
+                    aqi_us = parse_aqi_us(response.iter_content(chunk_size=16384, decode_unicode=True), deadline)
+                    if aqi_us is None:
+                        logger.warning("AQI US value not found for %s", city["city"])
+                        return 0
+
+                    if response.headers.get("ETag") or response.headers.get("Last-Modified"):
+                        aqi_us_validators[url] = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"), "value": aqi_us}
+                    return aqi_us
+                error = f"status {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
         except Exception as e:
-            try_count = try_count + 1
-            time.sleep(try_count * 60)
-    return 0
-
-
-def get_weather_data():
-    url = f"http://api.weatherapi.com/v1/current.json?key={weather_api_key}&q=Chandigarh&aqi=no"
-    response = requests.get(url, headers={"accept": "application/json"})
+            logger.warning("AQI US scrape failed for %s: %s", city["city"], e)
+            return 0
+
+        # Exponential backoff with full jitter, giving up when the next attempt would start past the deadline
+        delay = random.uniform(0, min(aqi_us_backoff["cap"], aqi_us_backoff["base"] * 2 ** attempt))
+        attempt += 1
+        if time.monotonic() + delay >= deadline:
+            logger.warning("AQI US scrape failed for %s after %s attempt(s): %s", city["city"], attempt, error)
+            return 0
+        time.sleep(delay)
+
+
+@timed("fetch.weather")
+def get_weather_data(city, session=http_session, timeout=None):
+    timeout = timeout or source_timeouts["weather"]
+    params = {"key": weather_api_key, "q": city["weather_query"], "aqi": "no"}
+    response = session.get(weather_url, params=params, headers={"accept": "application/json"}, timeout=timeout)
+    response.raise_for_status()
     weather_data = response.json()
 
     temperature = round(weather_data["current"]["temp_c"])
@@ -128,111 +202,324 @@ def get_weather_data():
     return temperature, humidity, uv, wind, wind_degree
 
 
-def raw_to_s3(df):
-    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
-                             aws_secret_access_key=aws_secret_access_key)
+def fetch_sources(breakpoints, city, session=http_session):
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        aqi_in_future = executor.submit(get_aqi_in, breakpoints, city, session)
+        aqi_us_future = executor.submit(get_aqi_us, city, session)
+        weather_future = executor.submit(get_weather_data, city, session)
+
+        # The reading itself is required, the other sources fall back to empty values
+        aqi_in_values = aqi_in_future.result()
+        try:
+            aqi_us = aqi_us_future.result()
+        except Exception as e:
+            logger.warning("AQI US source failed for %s: %s", city["city"], e)
+            aqi_us = 0
+        try:
+            weather_values = weather_future.result()
+        except Exception as e:
+            logger.warning("Weather source failed for %s: %s", city["city"], e)
+            weather_values = (None, None, None, None, None)
+
+    return aqi_in_values, aqi_us, weather_values
+
+
+def fetch_city(breakpoints, city, session=http_session):
+    aqi_in_values, aqi_us, weather_values = fetch_sources(breakpoints, city, session)
+    current_time, aqi_in, pm2_5, pm10, so2, co, o3, no2, prominent_pollutant = aqi_in_values
+    temperature, humidity, uv, wind, wind_degree = weather_values
+
+    return pd.DataFrame([{
+        "timestamp": current_time,
+        "city": city["city"],
+        "aqi_in": aqi_in,
+        "pm2_5": pm2_5,
+        "pm10": pm10,
+        "so2": so2,
+        "co": co,
+        "o3": o3,
+        "no2": no2,
+        "aqi_us": aqi_us,
+        "prominent_pollutant": prominent_pollutant,
+        "temperature": temperature,
+        "humidity": humidity,
+        "uv": uv,
+        "wind": wind,
+        "wind_degree": wind_degree
+    }])
+
+
+def fetch_cities(breakpoints, cities, max_workers=city_concurrency, session=http_session):
+    raw_dfs = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {city["city"]: executor.submit(fetch_city, breakpoints, city, session) for city in cities}
+        for city_name, future in futures.items():
+            # A failing city is skipped for this run instead of failing every other city
+            try:
+                raw_dfs[city_name] = future.result()
+            except Exception:
+                logger.exception("Fetch failed for %s", city_name)
+    return raw_dfs
+
+
+@timed("raw_to_s3")
+def raw_to_s3(df, city_name, s3_client=None):
+    s3_client = s3_client or boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
+                                          aws_secret_access_key=aws_secret_access_key)
 
     current_datetime = datetime.now(pytz.timezone("Asia/Kolkata"))
-    file_location = f"{raw_data_path}/date={current_datetime.date()}/output_{current_datetime.strftime('%H_%M_%S')}.snappy.parquet"
+    file_location = f"{raw_data_path}/city={city_name}/date={current_datetime.date()}/output_{current_datetime.strftime('%H_%M_%S')}.snappy.parquet"
     bucket_name = file_location.split("/")[2]
     key = "/".join(file_location.split("/")[3:])
 
     buffer = io.BytesIO()
     df.to_parquet(buffer, engine="pyarrow", index=False)
     s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+    return key
+
+
+def read_manifest(s3_client):
+    bucket_name = manifest_file.split("/")[2]
+    key = "/".join(manifest_file.split("/")[3:])
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return {"last_keys": {}, "window_start": None}
+
+    manifest = json.loads(response["Body"].read())
+    manifest.setdefault("last_keys", {})
+    return manifest
+
+
+def write_manifest(s3_client, manifest):
+    bucket_name = manifest_file.split("/")[2]
+    key = "/".join(manifest_file.split("/")[3:])
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=json.dumps(manifest).encode("utf-8"))
     return True
 
 
-def read_s3():
-    fs = s3fs.S3FileSystem(
-        key=aws_access_key_id,
-        secret=aws_secret_access_key,
-        client_kwargs={'region_name': aws_region}
-    )
+def list_new_raw_objects(s3_client, city_name, start_after):
+    bucket_name = raw_data_path.split("/")[2]
+    prefix = "/".join(raw_data_path.split("/")[3:]) + f"/city={city_name}/"
 
-    today = datetime.now()
-    paths = []
+    # Raw keys are city=/date=YYYY-MM-DD/output_HH_MM_SS, so key order is time order within a city
+    keys = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, StartAfter=start_after):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".parquet"))
+    return [f"{bucket_name}/{key}" for key in keys]
 
-    for i in range(7):
-        d = today - timedelta(days=i)
-        date_str = d.strftime("%Y-%m-%d")
 
-        path = f"{raw_data_path}/date={date_str}/*.parquet"
-        paths.extend(fs.glob(path))
+def list_legacy_raw_objects(s3_client, window_start):
+    bucket_name = raw_data_path.split("/")[2]
+    prefix = "/".join(raw_data_path.split("/")[3:]) + "/date="
 
-    df = pd.read_parquet(paths, filesystem=fs)
+    # Before per city partitions every reading was the default city's, under date=YYYY-MM-DD/output_HH_MM_SS
+    keys = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, StartAfter=f"{prefix}{window_start}"):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".parquet"))
+    return [f"{bucket_name}/{key}" for key in keys]
+
+
+def read_raw_object(fs, path):
+    df = pd.read_parquet(path, filesystem=fs)
+    city = re.search(r"city=([^/]+)", path)
+    df["city"] = city.group(1) if city else default_city
+    df["date"] = re.search(r"date=([0-9-]+)", path).group(1)
+    return df
+
+
+def working_window_start():
+    return (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d")
+
+
+def tag_raw_frames(raw_dfs, raw_keys):
+    # Readings of a run, tagged with the partition they were written to
+    new_dfs = []
+    for city_name, raw_df in raw_dfs.items():
+        new_df = raw_df.copy()
+        new_df["city"] = city_name
+        new_df["date"] = re.search(r"date=([0-9-]+)", raw_keys[city_name]).group(1)
+        new_dfs.append(new_df)
+    return new_dfs
+
+
+def merge_working_set(dfs, window_start, city_names):
+    # A first run has neither a working set nor raw objects to start from
+    dfs = [df for df in dfs if not df.empty]
+    if not dfs:
+        return pd.DataFrame(columns=["city", "timestamp", "date"])
+
+    df = pd.concat(dfs, ignore_index=True)
     df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df = df.drop_duplicates(subset=["timestamp"], keep='last')
+    df["date"] = df["date"].astype(str)
+    df = df[(df["date"] >= window_start) & df["city"].isin(city_names)]
+    df = df.drop_duplicates(subset=["city", "timestamp"], keep='last')
+    return df.sort_values(["city", "timestamp"]).reset_index(drop=True)
+
 
-    return df.sort_values("timestamp").reset_index(drop=True)
+def advance_last_keys(last_keys, keys):
+    last_keys = dict(last_keys)
+    for key in keys:
+        city_name = re.search(r"city=([^/]+)", key).group(1)
+        last_keys[city_name] = max(last_keys.get(city_name) or key, key)
+    return last_keys
 
 
-def final_to_s3(df):
+def write_working_set(s3_client, df, last_keys, window_start):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", index=False)
+    s3_client.put_object(Bucket=history_file.split("/")[2], Key="/".join(history_file.split("/")[3:]), Body=buffer.getvalue())
+    return write_manifest(s3_client, {"last_keys": last_keys, "window_start": window_start})
+
+
+@timed("read_s3")
+def read_s3(cities, raw_dfs=None, raw_keys=None):
+    fs = s3fs.S3FileSystem(
+        key=aws_access_key_id,
+        secret=aws_secret_access_key,
+        client_kwargs={'region_name': aws_region}
+    )
     s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
                              aws_secret_access_key=aws_secret_access_key)
+    raw_dfs = raw_dfs or {}
+    raw_keys = raw_keys or {}
+
+    window_start = working_window_start()
+    raw_prefix = "/".join(raw_data_path.split("/")[3:])
+    city_names = [city["city"] for city in cities]
+
+    # Consolidated working set from previous runs
+    manifest = read_manifest(s3_client)
+    if manifest["window_start"] is not None:
+        history_df = pd.read_parquet(history_file, filesystem=fs)
+        if "city" not in history_df.columns:
+            history_df["city"] = default_city
+    else:
+        history_df = pd.DataFrame()
+
+    # Only fold in raw objects written since each city's checkpoint, listing cities concurrently
+    def city_start_after(city_name):
+        window_key = f"{raw_prefix}/city={city_name}/date={window_start}"
+        return max(manifest["last_keys"].get(city_name) or window_key, window_key)
+
+    # A checkpoint inside a day compacted since then lists that day's part files, they are read by time range
+    # from the city's latest reading so only the row groups after it are fetched, with every column the working set keeps
+    def read_compacted(city_name, paths):
+        last_day = max(re.search(r"date=([0-9-]+)", path).group(1) for path in paths)
+        city_times = history_df["timestamp"][history_df["city"] == city_name] if not history_df.empty else pd.Series(dtype=object)
+        start = pd.Timestamp(city_times.max()) if not city_times.empty else pd.Timestamp(window_start)
+        return read_raw_range(city_name, start, pd.Timestamp(last_day) + timedelta(days=1) - timedelta(microseconds=1), fs=fs, s3_client=s3_client)
+
+    with ThreadPoolExecutor(max_workers=city_concurrency) as executor:
+        listed = dict(zip(city_names, executor.map(lambda city_name: list_new_raw_objects(s3_client, city_name, city_start_after(city_name)), city_names)))
+        new_paths = [path for paths in listed.values() for path in paths]
+
+        written_paths = {f"{raw_data_path.split('/')[2]}/{key}" for key in raw_keys.values()}
+        is_part = lambda path: path.rsplit("/", 1)[1].startswith(part_prefix)
+        compacted = [(city_name, [path for path in paths if is_part(path)]) for city_name, paths in listed.items() if any(map(is_part, paths))]
+        new_dfs = [df for df in executor.map(lambda item: read_compacted(*item), compacted) if df is not None]
+        new_dfs += list(executor.map(lambda path: read_raw_object(fs, path), [path for path in new_paths if path not in written_paths and not is_part(path)]))
+
+        # The first run without a working set folds in the legacy objects still inside the window, once,
+        # from then on they are part of the working set and no checkpoint tracks them
+        if manifest["window_start"] is None:
+            new_dfs = list(executor.map(lambda path: read_raw_object(fs, path), list_legacy_raw_objects(s3_client, window_start))) + new_dfs
+
+    # A first run has neither a working set nor raw objects, there is nothing to merge or checkpoint yet
+    if history_df.empty and not new_dfs and not raw_dfs:
+        return pd.DataFrame(columns=["city", "timestamp", "date"])
+
+    # The readings written by this run are merged in memory instead of read back
+    df = merge_working_set([history_df] + new_dfs + tag_raw_frames(raw_dfs, raw_keys), window_start, city_names)
+
+    # Persist the working set before advancing the checkpoints
+    last_keys = advance_last_keys(manifest["last_keys"], [path.split("/", 1)[1] for path in new_paths] + list(raw_keys.values()))
+    if last_keys != manifest["last_keys"] or manifest["window_start"] != window_start:
+        write_working_set(s3_client, df, last_keys, window_start)
+
+    return df
+
+
+def check_consistency(s3_client, raw_keys):
+    # The manifest read back from s3 has to cover every raw object this run wrote, a checkpoint behind one
+    # means the working set was not persisted or a concurrent run replaced it
+    last_keys = read_manifest(s3_client)["last_keys"]
+    behind = sorted(city_name for city_name, key in raw_keys.items() if (last_keys.get(city_name) or "") < key)
+    if behind:
+        raise RuntimeError(f"Checkpoint is behind this run's raw objects for {', '.join(behind)}")
+    return True
 
-    file_location = f"{final_data_path}/output.csv"
-    bucket_name = file_location.split("/")[2]
-    key = "/".join(file_location.split("/")[3:])
 
-    buffer = io.BytesIO()
-    df.to_csv(buffer, index=False)
-    s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+def read_aggregator(s3_client):
+    bucket_name, key = aggregator_file.split("/")[2], "/".join(aggregator_file.split("/")[3:])
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return CPCBAggregator()
+    return CPCBAggregator(json.loads(response["Body"].read()))
+
+
+def aggregator_to_s3(s3_client, aggregator):
+    bucket_name, key = aggregator_file.split("/")[2], "/".join(aggregator_file.split("/")[3:])
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=json.dumps(aggregator.to_dict()).encode("utf-8"))
     return True
 
 
-def lambda_handler(event=None, context=None):
-    # CPCB Breakpoint Ranges
-    breakpoint_df = pd.read_csv(pollutant_breakpoints)
+def enrich_working_set(df, aggregator, breakpoints):
+    # Carry weather forward over readings where the weather source was unavailable
+    weather_columns = ["temperature", "humidity", "uv", "wind", "wind_degree"]
+    df[weather_columns] = df.groupby("city")[weather_columns].ffill()
 
-    # AQI India Standard
-    current_time, aqi_in, pm2_5, pm10, so2, co, o3, no2, prominent_pollutant = get_aqi_in(breakpoint_df)
+    with span("aggregation", rows=len(df)):
+        aggregator.update_from_frame(df)
+        aqi_24 = {city_name: calculate_aqi(aggregator.city(city_name).aqi_inputs(), breakpoints)[0] for city_name in df["city"].unique()}
+        df["aqi_24"] = df["city"].map(aqi_24)
+    return df
 
-    # AQI US Standard
-    aqi_us = get_aqi_us()
 
-    # Weather Data API
-    temperature, humidity, uv, wind, wind_degree = get_weather_data()
+@timed("final_to_s3")
+def final_to_s3(df, s3_client=None):
+    s3_client = s3_client or boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
+                                          aws_secret_access_key=aws_secret_access_key)
 
-    # Write Raw Data to s3
-    raw_df = pd.DataFrame([{
-        "timestamp": current_time,
-        "aqi_in": aqi_in,
-        "pm2_5": pm2_5,
-        "pm10": pm10,
-        "so2": so2,
-        "co": co,
-        "o3": o3,
-        "no2": no2,
-        "aqi_us": aqi_us,
-        "prominent_pollutant": prominent_pollutant,
-        "temperature": temperature,
-        "humidity": humidity,
-        "uv": uv,
-        "wind": wind,
-        "wind_degree": wind_degree
-    }])
-    raw_to_s3(raw_df)
-
-    # Read all Raw s3 Data
-    time.sleep(120)
-    df = read_s3()
-
-    # Calculate AQI 24 hrs
-    df_cpcb = df.copy()
-    df_24hr_avg = df_cpcb.groupby("date", observed=True)[["pm2_5", "pm10", "so2", "no2"]].mean()
-
-    df_cpcb = df_cpcb.set_index("timestamp").sort_index()
-    df_cpcb["co"] = df_cpcb["co"].rolling("8h").mean()
-    df_cpcb["o3"] = df_cpcb["o3"].rolling("8h").mean()
-    df_8hr_max = df_cpcb.resample("D")[["co", "o3"]].max()
-
-    df_24hr_avg.index = pd.to_datetime(df_24hr_avg.index).date
-    df_8hr_max.index = pd.to_datetime(df_8hr_max.index).date
-    final_df = pd.merge(df_24hr_avg, df_8hr_max, left_index=True, right_index=True, how='inner')
-    final_df = final_df.loc[[final_df.index.max()]]
-    aqi_24, prominent = calculate_aqi(final_df, breakpoint_df)
-    df["aqi_24"] = aqi_24
+    # Publishes a columnar delta per run and a new base snapshot every few runs
+    return publish_final(s3_client, df, final_data_path)
+
+
+@timed("lambda_handler")
+def lambda_handler(event=None, context=None):
+    # Stage Timings go to the log stream as JSON lines, METRICS_ENABLED=false turns them off
+    add_observer(log_observer)
+
+    # CPCB Breakpoint Ranges and Tracked Cities
+    breakpoints = load_breakpoints(pollutant_breakpoints)
+    cities = load_cities(city_registry)
+
+    # AQI India Standard, AQI US Standard and Weather Data API fetched concurrently for every city
+    with span("fetch", cities=len(cities)):
+        raw_dfs = fetch_cities(breakpoints, cities)
+
+    # Write Raw Data to s3, partitioned by city and date
+    with ThreadPoolExecutor(max_workers=city_concurrency) as executor:
+        raw_keys = dict(zip(raw_dfs, executor.map(raw_to_s3, raw_dfs.values(), raw_dfs.keys())))
+
+    # Read all Raw s3 Data, merging this run's readings without waiting on s3
+    df = read_s3(cities, raw_dfs, raw_keys)
+    if df.empty:
+        return {
+            'statusCode': 200,
+            'body': json.dumps('No readings to process yet')
+        }
+    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
+                             aws_secret_access_key=aws_secret_access_key)
+    check_consistency(s3_client, raw_keys)
+
+    # Calculate AQI 24 hrs per City, only this run's readings update the persisted running state
+    aggregator = read_aggregator(s3_client)
+    df = enrich_working_set(df, aggregator, breakpoints)
+    aggregator_to_s3(s3_client, aggregator)
 
     # Write Final Data
     final_to_s3(df)
@@ -0,0 +1,54 @@
+// Version Push
+// One EventSource per page keeps the latest published versions, the clientside callback below
+// hands them to the data_version and forecast_version stores only when they change
+window.aqiPush = {versions: null, connected: false};
+
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+    var config = JSON.parse(document.getElementById("_dash-config").textContent);
+
+    function connect() {
+        var source = new EventSource(config.requests_pathname_prefix + "events");
+
+        source.addEventListener("versions", function (event) {
+            window.aqiPush.versions = JSON.parse(event.data);
+        });
+        source.addEventListener("open", function () {
+            window.aqiPush.connected = true;
+        });
+        source.addEventListener("error", function () {
+            window.aqiPush.connected = false;
+            // A refused stream (503 once the server is at its stream limit) is not retried by the browser,
+            // the page polls meanwhile and tries again after a spread out delay
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(connect, 30000 + Math.random() * 60000);
+            }
+        });
+    }
+    connect();
+})();
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    aqi_push: {
+        // Runs in the browser on every push_interval tick, the server only hears about changed versions.
+        // Without a push connection it falls back to a refresh every fallback_ticks
+        versions: function (n_intervals, fallback_ticks, data_version, forecast_version) {
+            var no_update = window.dash_clientside.no_update;
+            var push = window.aqiPush;
+
+            if (!push.connected || !push.versions) {
+                if (n_intervals && n_intervals % fallback_ticks === 0) {
+                    var tick = "poll-" + n_intervals;
+                    return [tick, tick];
+                }
+                return [no_update, no_update];
+            }
+            return [
+                push.versions.data === data_version ? no_update : push.versions.data,
+                push.versions.forecast === forecast_version ? no_update : push.versions.forecast
+            ];
+        }
+    }
+});
@@ -0,0 +1,76 @@
+# Importing Libraries
+import io
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+from aqi_engine import load_breakpoints, score_aqi
+from cpcb_aggregator import rolling_aqi_inputs, rolling_window
+from metrics import timed, add_observer, log_observer
+from raw_store import s3_clients, read_raw_range
+from storage_config import s3_path, pollutant_breakpoints, city_registry, load_cities
+
+# Backfilled Readings, one file per city and day with the aqi_24 every reading should have had
+history_data_path = f"{s3_path}/data/history"
+partition_threads = 16
+
+
+def write_history_partition(s3_client, df, city_name, day):
+    bucket_name = history_data_path.split("/")[2]
+    key = "/".join(history_data_path.split("/")[3:]) + f"/city={city_name}/date={day}/readings.snappy.parquet"
+    # city and date live in the partition path, so the whole layout reads back as one hive dataset
+    buffer = io.BytesIO()
+    df.drop(columns=["city", "date"]).to_parquet(buffer, engine="pyarrow", index=False)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+    return key
+
+
+@timed("backfill.city")
+def backfill_city(city_name, start_date, end_date, breakpoints, dry_run=False):
+    fs, s3_client = s3_clients()
+
+    # The last 8 hours before the range open the first day's rolling window, row groups before them are skipped
+    start_time = pd.Timestamp(start_date) - rolling_window
+    end_time = pd.Timestamp(end_date + timedelta(days=1)) - pd.Timedelta(microseconds=1)
+    df = read_raw_range(city_name, start_time, end_time, fs=fs, s3_client=s3_client)
+    if df is None:
+        return city_name, 0, 0
+
+    # One vectorized pass over the whole range
+    df, inputs = rolling_aqi_inputs(df)
+    aqi, _ = score_aqi(inputs, breakpoints, rounding="ceil")
+    df["aqi_24"] = pd.Series(aqi, index=df.index).round().astype("int64")
+    df = df[df["date"] >= str(start_date)]
+
+    if dry_run:
+        return city_name, len(df), 0
+    with ThreadPoolExecutor(max_workers=partition_threads) as executor:
+        keys = list(executor.map(lambda item: write_history_partition(s3_client, item[1], city_name, item[0]), df.groupby("date")))
+    return city_name, len(df), len(keys)
+
+
+def backfill(start_date, end_date, cities=None, max_workers=4, dry_run=False):
+    breakpoints = load_breakpoints(pollutant_breakpoints)
+    city_names = cities or [city["city"] for city in load_cities(city_registry)]
+
+    # Cities run in separate processes, each reads and writes its day partitions over a thread pool
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(backfill_city, city_name, start_date, end_date, breakpoints, dry_run) for city_name in city_names]
+        results = [future.result() for future in futures]
+
+    for city_name, rows, partitions in results:
+        print(f"{city_name}: {rows} readings, {partitions} partitions written")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the rolling CPCB aqi_24 of every raw reading in a date range")
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, required=True)
+    parser.add_argument("--cities", nargs="*", help="defaults to every city in the registry")
+    parser.add_argument("--workers", type=int, default=4, help="cities processed in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="compute without writing the history partitions")
+    args = parser.parse_args()
+    add_observer(log_observer)
+
+    backfill(args.start, args.end, args.cities, args.workers, args.dry_run)
@@ -0,0 +1,84 @@
+# Importing Libraries
+import os, sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aqi_engine import compile_breakpoints, score_aqi
+
+# Local Breakpoint Table
+breakpoint_csv = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "aqi_concentration_breakpoints.csv")
+pollutants = ["pm10", "pm2_5", "co", "no2", "o3", "so2"]
+
+
+# Synthetic Hourly Readings
+def synthetic_readings(years, seed=0):
+    rng = np.random.default_rng(seed)
+    time_index = pd.date_range("2023-01-01", periods=int(years * 365 * 24), freq="h")
+    scale = {"pm10": 120, "pm2_5": 60, "co": 1.2, "no2": 30, "o3": 60, "so2": 10}
+    df = pd.DataFrame({"time": time_index})
+    for pollutant_key in pollutants:
+        df[pollutant_key] = rng.gamma(2.0, scale[pollutant_key] / 2.0, len(df))
+    return df
+
+
+# Previous per Row Implementation
+def legacy_calculate_aqi(row, breakpoint_df):
+    aqi_breakpoint = 0
+    for pollutant_key in pollutants:
+
+        pollutant_value = round(row[pollutant_key])
+        breakpoint_pollutant_df = breakpoint_df[breakpoint_df["pollutant"] == pollutant_key]
+
+        if pollutant_value < breakpoint_pollutant_df["low_concentration"].min():
+            breakpoint_row = breakpoint_pollutant_df.iloc[0]
+        elif pollutant_value > breakpoint_pollutant_df["upper_concentration"].max():
+            breakpoint_row = breakpoint_pollutant_df.iloc[-1]
+        else:
+            breakpoint_row = breakpoint_pollutant_df[
+                (breakpoint_pollutant_df["low_concentration"] <= pollutant_value) &
+                (breakpoint_pollutant_df["upper_concentration"] >= pollutant_value)
+                ].iloc[0]
+
+        c_low = breakpoint_row["low_concentration"]
+        c_high = breakpoint_row["upper_concentration"]
+        i_low = breakpoint_row["low_aqi"]
+        i_high = breakpoint_row["upper_aqi"]
+
+        aqi = ((i_high - i_low) / (c_high - c_low)) * (row[pollutant_key] - c_low) + i_low
+        if aqi > aqi_breakpoint:
+            aqi_breakpoint = aqi
+    return round(aqi_breakpoint, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized AQI engine against the per row apply")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--legacy-rows", type=int, default=5000, help="rows timed with the per row apply, extrapolated to the full frame")
+    args = parser.parse_args()
+
+    breakpoint_df = pd.read_csv(breakpoint_csv)
+    df = synthetic_readings(args.years)
+
+    start = time.perf_counter()
+    breakpoints = compile_breakpoints(breakpoint_df)
+    aqi, prominent_pollutant = score_aqi(df, breakpoints, pollutants=pollutants, rounding="round")
+    engine_seconds = time.perf_counter() - start
+
+    sample = df.head(args.legacy_rows)
+    start = time.perf_counter()
+    legacy_aqi = sample.apply(legacy_calculate_aqi, breakpoint_df=breakpoint_df, axis=1)
+    legacy_seconds = (time.perf_counter() - start) * len(df) / len(sample)
+
+    mismatches = int((np.abs(legacy_aqi.to_numpy() - np.round(aqi[:len(sample)], 2)) > 0.01).sum())
+    print(f"rows: {len(df)}")
+    print(f"engine: {engine_seconds:.4f}s")
+    print(f"legacy (extrapolated): {legacy_seconds:.2f}s")
+    print(f"speedup: {legacy_seconds / engine_seconds:.0f}x")
+    print(f"mismatches in sample: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
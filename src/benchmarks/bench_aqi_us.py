@@ -0,0 +1,67 @@
+# Importing Libraries
+import os, sys
+import re
+import time
+import argparse
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("METRICS_ENABLED", "false")
+import bench_fixtures as fixtures
+import aqi_fetch_data
+
+
+# Previous full page parse
+def legacy_parse(html_content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, "html.parser")
+    aqi_div = soup.find("div", class_=re.compile(".*aqi-value.*"))
+    for span in aqi_div.find_all("span"):
+        aqi_us = span.find(string=True, recursive=False).strip()
+        if aqi_us.isdigit():
+            return int(aqi_us)
+
+
+def chunked(text, size=16384):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+def timed_loop(func, repeats):
+    start = time.process_time()
+    for _ in range(repeats):
+        value = func()
+    return (time.process_time() - start) / repeats, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time of the targeted aqi.in parser against the full BeautifulSoup parse, and fetches with conditional GETs")
+    parser.add_argument("--page-kb", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--fetches", type=int, default=200)
+    args = parser.parse_args()
+
+    page = fixtures.aqi_us_page(123, filler_kb=args.page_kb)
+    targeted_seconds, targeted_value = timed_loop(lambda: aqi_fetch_data.parse_aqi_us(chunked(page)), args.repeats)
+    print(f"page: {len(page) / 1024:.0f} KB")
+    print(f"targeted parse: {targeted_seconds * 1000:.3f} ms cpu, value {targeted_value}")
+    try:
+        legacy_seconds, legacy_value = timed_loop(lambda: legacy_parse(page), max(1, args.repeats // 4))
+        print(f"full parse: {legacy_seconds * 1000:.3f} ms cpu, value {legacy_value}")
+        print(f"speedup: {legacy_seconds / targeted_seconds:.0f}x")
+    except ImportError:
+        print("full parse: skipped, beautifulsoup4 is not installed")
+
+    # Repeated fetches of one city, most of which the stub answers with 304 once the ETag is known
+    session = requests.Session()
+    adapter = fixtures.StubSourceAdapter()
+    session.mount("https://", adapter)
+    city = fixtures.synthetic_cities(1)[0]
+    start = time.process_time()
+    for _ in range(args.fetches):
+        aqi_fetch_data.get_aqi_us(city, session)
+    print(f"fetch with conditional GET: {(time.process_time() - start) / args.fetches * 1000:.3f} ms cpu per fetch over {args.fetches} fetches")
+
+
+if __name__ == "__main__":
+    main()
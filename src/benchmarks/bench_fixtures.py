@@ -0,0 +1,243 @@
+# Importing Libraries
+import os, io, json
+import time
+import socket
+import logging
+import functools
+import numpy as np
+import pandas as pd
+from datetime import timezone
+from requests import Response
+from requests.adapters import BaseAdapter
+
+# Local Paths
+src_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+breakpoint_csv = os.path.join(src_folder, "Data", "aqi_concentration_breakpoints.csv")
+
+# Bucket used by every module
+bucket_name = "github-projects-resume"
+s3_prefix = "Real_Time_Analytical_Dashboard"
+aws_region = "ap-south-1"
+
+# Typical Concentrations, gamma distributed around these means
+pollutant_scale = {"pm10": 120, "pm2_5": 60, "co": 1.2, "no2": 30, "o3": 60, "so2": 10}
+weather_columns = ["temperature", "humidity", "uv", "wind", "wind_degree"]
+
+
+# Synthetic Cities and Readings
+def synthetic_cities(n):
+    rng = np.random.default_rng(n)
+    return [{
+        "city": f"city_{i:03d}",
+        "name": f"City {i:03d}",
+        "latitude": round(float(rng.uniform(8, 35)), 4),
+        "longitude": round(float(rng.uniform(68, 97)), 4),
+        "aqi_us_path": f"india/city_{i:03d}",
+        "weather_query": f"City {i:03d}"
+    } for i in range(n)]
+
+
+def synthetic_readings(cities, days, freq="5min", end=None, seed=0):
+    # Readings in the shape of the final layer, ending at the current time unless told otherwise
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.now(tz="Asia/Kolkata")).floor(freq)
+    timestamps = pd.date_range(end=end, periods=int(pd.Timedelta(days=days) / pd.Timedelta(freq)), freq=freq)
+    n = len(timestamps)
+
+    frames = []
+    for city in cities:
+        # Daily cycle with noise so rolling averages and maxima move
+        cycle = 1 + 0.4 * np.sin(2 * np.pi * (timestamps.hour.to_numpy() + timestamps.minute.to_numpy() / 60) / 24)
+        df = pd.DataFrame({"timestamp": timestamps, "city": city["city"]})
+        for pollutant_key, scale in pollutant_scale.items():
+            df[pollutant_key] = rng.gamma(2.0, scale / 2.0, n) * cycle
+        df["aqi_in"] = rng.integers(30, 300, n)
+        df["aqi_us"] = rng.integers(30, 300, n)
+        df["prominent_pollutant"] = rng.choice(["pm2_5", "pm10", "o3", "no2"], n)
+        df["temperature"] = rng.integers(5, 45, n)
+        df["humidity"] = rng.integers(10, 100, n)
+        df["uv"] = rng.integers(0, 11, n)
+        df["wind"] = rng.integers(0, 40, n)
+        df["wind_degree"] = rng.integers(0, 360, n)
+        frames.append(df)
+
+    df = pd.concat(frames, ignore_index=True)
+    df["date"] = df["timestamp"].dt.date.astype(str)
+    df["aqi_24"] = rng.integers(30, 300, len(df))
+    return df
+
+
+@functools.lru_cache(maxsize=8)
+def aqi_us_template(filler_kb, seed):
+    # Shaped like the aqi.in dashboard, scripts and markup before the value block and most of the page after it
+    rng = np.random.default_rng(seed)
+    def filler(kb):
+        blocks = []
+        while sum(len(b) for b in blocks) < kb * 1024:
+            blocks.append(f'<div class="card-{rng.integers(1000)}"><span class="label">Station {rng.integers(1000)}</span><p>{"lorem ipsum " * 8}</p></div>')
+        return "".join(blocks)
+
+    return (
+        '<!DOCTYPE html><html><head><title>AQI</title>'
+        f'<script>{"var x = 1;" * 2000}</script><style>{".a{color:red}" * 1000}</style></head><body>'
+        f'{filler(filler_kb // 10)}'
+        '<div class="flex aqi-value-box"><span class="text-xs">AQI (US)</span><span class="text-6xl"> __AQI__ </span></div>'
+        f'{filler(filler_kb)}</body></html>'
+    )
+
+
+def aqi_us_page(value, filler_kb=300, seed=0):
+    return aqi_us_template(filler_kb, seed).replace("__AQI__", str(value))
+
+
+def cities_csv(cities):
+    return pd.DataFrame(cities).to_csv(index=False).encode("utf-8")
+
+
+def parquet_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", index=False)
+    return buffer.getvalue()
+
+
+# Stubbed HTTP Sources
+# Mounted on a requests Session in place of HTTPAdapter, answers the three sources with generated payloads
+class StubSourceAdapter(BaseAdapter):
+    def __init__(self, latency=0.0, seed=0, page_change_rate=0.25):
+        super().__init__()
+        self.latency = latency
+        self.rng = np.random.default_rng(seed)
+        self.page_change_rate = page_change_rate
+        self.pages = {}
+        self.calls = 0
+
+    def _response(self, request, body, content_type):
+        response = Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = content_type
+        response._content = body.encode("utf-8")
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "airquality.googleapis.com" in request.url:
+            body = json.dumps({
+                "dateTime": pd.Timestamp.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "pollutants": [
+                    {"code": "pm25", "concentration": {"value": float(self.rng.gamma(2, 30)), "units": "MICROGRAMS_PER_CUBIC_METER"}},
+                    {"code": "pm10", "concentration": {"value": float(self.rng.gamma(2, 60)), "units": "MICROGRAMS_PER_CUBIC_METER"}},
+                    {"code": "no2", "concentration": {"value": float(self.rng.gamma(2, 8)), "units": "PARTS_PER_BILLION"}},
+                    {"code": "so2", "concentration": {"value": float(self.rng.gamma(2, 2)), "units": "PARTS_PER_BILLION"}},
+                    {"code": "co", "concentration": {"value": float(self.rng.gamma(2, 400)), "units": "PARTS_PER_BILLION"}},
+                    {"code": "o3", "concentration": {"value": float(self.rng.gamma(2, 15)), "units": "PARTS_PER_BILLION"}}
+                ]
+            })
+            return self._response(request, body, "application/json")
+
+        if "aqi.in" in request.url:
+            # The page keeps its ETag until its value changes, matching requests get a 304
+            if request.url not in self.pages or self.rng.random() < self.page_change_rate:
+                value = int(self.rng.integers(30, 300))
+                self.pages[request.url] = (f'"{request.url.rsplit("/", 1)[-1]}-{value}"', aqi_us_page(value))
+            etag, body = self.pages[request.url]
+            if request.headers.get("If-None-Match") == etag:
+                response = self._response(request, "", "text/html")
+                response.status_code = 304
+            else:
+                response = self._response(request, body, "text/html; charset=utf-8")
+            response.headers["ETag"] = etag
+            return response
+
+        if "weatherapi.com" in request.url:
+            body = json.dumps({"current": {
+                "temp_c": float(self.rng.uniform(5, 45)), "humidity": int(self.rng.integers(10, 100)), "uv": float(self.rng.uniform(0, 11)),
+                "wind_kph": float(self.rng.uniform(0, 40)), "wind_degree": int(self.rng.integers(0, 360))
+            }})
+            return self._response(request, body, "application/json")
+
+        response = self._response(request, "", "text/plain")
+        response.status_code = 404
+        return response
+
+    def close(self):
+        pass
+
+
+# Local s3 Stand In
+# A moto server on localhost, every boto3 and s3fs client in the process is pointed at it through AWS_ENDPOINT_URL
+def start_local_s3():
+    from moto.server import ThreadedMotoServer
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    os.environ.update({
+        "AWS_ENDPOINT_URL": f"http://127.0.0.1:{port}",
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_DEFAULT_REGION": aws_region
+    })
+    return server
+
+
+def create_bucket(s3_client):
+    s3_client.create_bucket(Bucket=bucket_name, CreateBucketConfiguration={"LocationConstraint": aws_region})
+
+
+def seed_resources(s3_client, cities):
+    with open(breakpoint_csv, "rb") as f:
+        s3_client.put_object(Bucket=bucket_name, Key=f"{s3_prefix}/resources/aqi_concentration_breakpoints.csv", Body=f.read())
+    s3_client.put_object(Bucket=bucket_name, Key=f"{s3_prefix}/resources/cities.csv", Body=cities_csv(cities))
+
+
+def raw_key(city_name, timestamp):
+    # Same layout raw_to_s3 writes
+    return f"{s3_prefix}/data/raw/city={city_name}/date={timestamp.date()}/output_{timestamp.strftime('%H_%M_%S')}.snappy.parquet"
+
+
+def seed_raw_objects(s3_client, df):
+    # One raw object per reading
+    keys = {}
+    for row in df.to_dict("records"):
+        key = raw_key(row["city"], row["timestamp"])
+        raw_df = pd.DataFrame([{k: v for k, v in row.items() if k not in ("date", "aqi_24")}])
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=parquet_bytes(raw_df))
+        keys[row["city"]] = max(keys.get(row["city"], key), key)
+    return keys
+
+
+def seed_final_layer(s3_client, df):
+    import final_store
+    clear_prefix(s3_client, f"{s3_prefix}/data/final/")
+    return final_store.publish_final(s3_client, df, f"s3://{bucket_name}/{s3_prefix}/data/final")
+
+
+def seed_model(s3_client, df, city_name):
+    # A model trained on one city's hourly readings, published the way the training lambda does
+    import ml_model_creation
+
+    training_df = df[df["city"] == city_name].set_index("timestamp").resample("h").mean(numeric_only=True).dropna().reset_index()
+    training_df = training_df.tail(2000).rename(columns={"timestamp": "time"})
+    training_df["time"] = training_df["time"].dt.tz_localize(None)
+    training_df["month"], training_df["day"], training_df["hour"] = training_df["time"].dt.month, training_df["time"].dt.day, training_df["time"].dt.hour
+    training_df["aqi"] = training_df["aqi_in"]
+    return ml_model_creation.model_to_s3(s3_client, ml_model_creation.model_training(training_df))
+
+
+def clear_prefix(s3_client, prefix):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if objects:
+            s3_client.delete_objects(Bucket=bucket_name, Delete={"Objects": objects})
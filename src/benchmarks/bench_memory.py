@@ -0,0 +1,141 @@
+# Importing Libraries
+import os, sys, json
+import gc
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bench_fixtures as fixtures
+
+
+# Worker Memory
+# Each worker is a fresh process that maps the shared Arrow file the way the dashboard does.
+# Anonymous memory holds the worker's own copies and is paid by every gunicorn worker, pages
+# mapped from the file live in the page cache and are paid once per host
+def memory_fields():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {"anonymous": fields["Anonymous"], "file_mapped": fields["Rss"] - fields["Anonymous"]}
+
+
+def worker(mode, cache_dir):
+    import pyarrow as pa
+    from shared_cache import SharedDataCache
+
+    gc.collect()
+    before = memory_fields()
+    if mode == "legacy":
+        # Previous read path, every column converted and consolidated into process memory
+        table = pa.ipc.open_file(pa.memory_map(os.path.join(cache_dir, "legacy.arrow"), "r")).read_all()
+        df = table.to_pandas()
+        del table
+    else:
+        df = SharedDataCache(None, cache_dir, name="compact").snapshot()[0]
+
+    # Every column is read once, as the callbacks would
+    for column in df.columns:
+        if df[column].dtype.kind in "fiu":
+            df[column].sum()
+    gc.collect()
+    after = memory_fields()
+    print(json.dumps({key: after[key] - before[key] for key in after}))
+
+
+def measure_worker(mode, cache_dir, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", mode, "--cache-dir", cache_dir],
+                                cwd=fixtures.src_folder, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: int(statistics.median(sample[key] for sample in samples)) for key in samples[0]}
+
+
+def mib(value):
+    return f"{value / 2 ** 20:8.2f} MiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of the dashboard's history frame with default and compact dtypes, in memory, on disk and per worker")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--freq", default="5min")
+    parser.add_argument("--runs", type=int, default=3, help="worker processes measured per mode")
+    parser.add_argument("--output", default="memory_results.json")
+    parser.add_argument("--worker", choices=["legacy", "compact"], help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.cache_dir)
+        return
+
+    from bench_suite import measure, git_commit
+    from shared_cache import SharedDataCache
+    from history_schema import compact_history
+
+    cities = fixtures.synthetic_cities(args.cities)
+    frames = {"legacy": fixtures.synthetic_readings(cities, args.days, freq=args.freq)}
+    frames["compact"] = compact_history(frames["legacy"])
+    print(f"{len(frames['legacy'])} readings, {args.cities} cities")
+
+    memory = {}
+    print(f"{'column':<22}{'legacy':>16}{'compact':>16}")
+    legacy_columns, compact_columns = (frames[name].memory_usage(deep=True, index=False) for name in ["legacy", "compact"])
+    for column in legacy_columns.index:
+        print(f"{column:<22}{mib(legacy_columns[column]):>16}{mib(compact_columns[column]):>16}")
+    for name, df in frames.items():
+        memory[f"frame.{name}_bytes"] = int(df.memory_usage(deep=True, index=False).sum())
+
+    # Shared Arrow files, written the way the refresher writes them
+    cache_dir = tempfile.mkdtemp(prefix="aqi_memory_")
+    for name, df in frames.items():
+        cache = SharedDataCache(None, cache_dir, name=name)
+        cache.write(df, 1)
+        memory[f"arrow_file.{name}_bytes"] = os.path.getsize(cache.path)
+
+    if os.path.exists("/proc/self/smaps_rollup"):
+        for name in frames:
+            for key, value in measure_worker(name, cache_dir, args.runs).items():
+                memory[f"worker.{name}_{key}_bytes"] = value
+    else:
+        print("worker memory: skipped, /proc/self/smaps_rollup is not available")
+
+    for name, value in memory.items():
+        print(f"{name:<45} {mib(value)}")
+    print(f"frame reduction: {memory['frame.legacy_bytes'] / memory['frame.compact_bytes']:.1f}x")
+
+    # Per callback city slice, on the frame each worker actually holds
+    results = {}
+    shared_df = SharedDataCache(None, cache_dir, name="compact").snapshot()[0]
+    city_name = cities[0]["city"]
+    for name, df in [("legacy", frames["legacy"]), ("compact", shared_df)]:
+        results[f"memory.city_slice.{name}"] = measure(lambda: df[df["city"] == city_name], 5, number=50)
+        print(f"{'city_slice.' + name:<45} median {results[f'memory.city_slice.{name}']['median_s'] * 1000:10.3f} ms")
+
+    output = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": vars(args),
+            "memory_bytes": memory
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Importing Libraries
+import os, sys, json
+import re
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bench_fixtures as fixtures
+from bench_suite import compare, git_commit
+
+# Dashboard Entry Point
+app_file = os.path.join(fixtures.src_folder, "app.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_env(warmup, port=None):
+    # Every run starts from an empty shared cache, as a freshly scheduled container would
+    env = {**os.environ, "APP_WARMUP": str(warmup).lower(), "DATA_CACHE_DIR": tempfile.mkdtemp(prefix="aqi_startup_")}
+    if port is not None:
+        env["PORT"] = str(port)
+    return env
+
+
+# Import Time
+def measure_import(warmup):
+    code = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=fixtures.src_folder, env=app_env(warmup),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def import_breakdown(top=12):
+    # Cumulative import time of the modules app.py imports directly, from python -X importtime
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=fixtures.src_folder, env=app_env(False),
+                            capture_output=True, text=True, check=True).stderr
+    modules = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|   ?(\w[\w.]*)$", line)
+        if match:
+            modules[match.group(2)] = int(match.group(1)) / 1e6
+    return dict(sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top])
+
+
+# Time to First Response
+def chart_callback(city_name):
+    return {
+        "output": "..aqi_line_chart.figure...aqi_line_chart_state.data..",
+        "outputs": [{"id": "aqi_line_chart", "property": "figure"}, {"id": "aqi_line_chart_state", "property": "data"}],
+        "inputs": [{"id": "data_version", "property": "data", "value": None}, {"id": "forecast_version", "property": "data", "value": None},
+                   {"id": "city_select", "property": "value", "value": city_name}],
+        "state": [{"id": "aqi_line_chart_state", "property": "data", "value": None}],
+        "changedPropIds": ["city_select.value"]
+    }
+
+
+def measure_server(warmup, city_name, timeout=180):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, app_file], cwd=fixtures.src_folder, env=app_env(warmup, port),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Ready once the port accepts connections, the point a container platform starts routing traffic
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"app.py exited with {process.returncode} before listening")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"app.py did not listen within {timeout}s")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+
+        request_start = time.perf_counter()
+        requests.get(url, timeout=timeout).raise_for_status()
+        first_page = time.perf_counter() - request_start
+
+        request_start = time.perf_counter()
+        requests.post(f"{url}/_dash-update-component", json=chart_callback(city_name), timeout=timeout).raise_for_status()
+        first_chart = time.perf_counter() - request_start
+
+        return {"ready_s": ready, "first_page_s": first_page, "first_chart_s": first_chart, "first_chart_total_s": time.perf_counter() - start}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarise(samples):
+    return {
+        "repeats": len(samples),
+        "number": 1,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start of the dashboard: import time and time to first response, with and without warmup")
+    parser.add_argument("--cities", type=int, default=5)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", default="startup_results.json")
+    parser.add_argument("--baseline", help="previous results file, exits non zero when a median regresses past the tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # The app processes inherit the local s3 endpoint and credentials from this process
+    server = fixtures.start_local_s3()
+    os.environ.update({"DATA_REFRESH_INTERVAL": "3600", "MODEL_POLL_INTERVAL": "3600"})
+
+    import boto3
+    s3_client = boto3.client("s3", region_name=fixtures.aws_region)
+    cities = fixtures.synthetic_cities(args.cities)
+    df = fixtures.synthetic_readings(cities, args.days)
+    fixtures.create_bucket(s3_client)
+    fixtures.seed_resources(s3_client, cities)
+    fixtures.seed_final_layer(s3_client, df)
+    fixtures.seed_model(s3_client, df, cities[0]["city"])
+
+    results = {}
+    try:
+        for mode, warmup in [("cold", False), ("warmup", True)]:
+            imports = [measure_import(warmup) for _ in range(args.runs)]
+            servers = [measure_server(warmup, cities[0]["city"]) for _ in range(args.runs)]
+
+            results[f"startup.{mode}.import"] = summarise(imports)
+            for metric in servers[0]:
+                results[f"startup.{mode}.{metric[:-2]}"] = summarise([run[metric] for run in servers])
+            for name in [name for name in results if name.startswith(f"startup.{mode}.")]:
+                print(f"{name:<45} median {results[name]['median_s'] * 1000:10.1f} ms   min {results[name]['min_s'] * 1000:10.1f} ms")
+        breakdown = import_breakdown()
+    finally:
+        server.stop()
+
+    output = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": vars(args),
+            "import_breakdown_s": breakdown
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
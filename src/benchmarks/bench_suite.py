@@ -0,0 +1,273 @@
+# Importing Libraries
+import os, sys, json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("METRICS_ENABLED", "false")
+import bench_fixtures as fixtures
+
+
+# Timing
+# Every benchmark reports seconds per call, setup runs before each repeat and is not timed
+def measure(func, repeats, number=1, setup=None):
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "repeats": repeats,
+        "number": number,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "max_s": max(timings)
+    }
+
+
+class Suite:
+    def __init__(self, repeats, only=None):
+        self.repeats = repeats
+        self.only = only
+        self.results = {}
+
+    def wants(self, *names):
+        return not self.only or any(name.startswith(prefix) or prefix.startswith(name) for name in names for prefix in self.only)
+
+    def run(self, name, func, number=1, setup=None, repeats=None, **info):
+        if not self.wants(name):
+            return None
+        result = measure(func, repeats or self.repeats, number=number, setup=setup)
+        result.update(info)
+        self.results[name] = result
+        print(f"{name:<45} median {result['median_s'] * 1000:10.3f} ms   min {result['min_s'] * 1000:10.3f} ms")
+        return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=fixtures.src_folder, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+# AQI Calculation
+def bench_calculate_aqi(suite, df):
+    import aqi_fetch_data
+    from aqi_engine import load_breakpoints, score_aqi
+
+    breakpoints = load_breakpoints(fixtures.breakpoint_csv)
+    reading = df.iloc[[-1]][["pm2_5", "pm10", "so2", "no2", "co", "o3"]].reset_index(drop=True)
+    suite.run("calculate_aqi.single_reading", lambda: aqi_fetch_data.calculate_aqi(reading, breakpoints), number=200)
+    suite.run("calculate_aqi.batch", lambda: score_aqi(df, breakpoints, rounding="ceil"), rows=len(df))
+
+
+# Sources, every city against the stubbed HTTP sources
+def bench_fetch_cities(suite, cities, latency):
+    import aqi_fetch_data
+    from aqi_engine import load_breakpoints
+
+    breakpoints = load_breakpoints(fixtures.breakpoint_csv)
+    adapter = fixtures.StubSourceAdapter(latency=latency)
+    aqi_fetch_data.http_session.mount("https://", adapter)
+    aqi_fetch_data.http_session.mount("http://", adapter)
+    suite.run("fetch_cities.stub_http", lambda: aqi_fetch_data.fetch_cities(breakpoints, cities), cities=len(cities), http_latency_s=latency)
+
+
+def working_window(df):
+    # The six days read_s3 keeps in the working set
+    window_start = (pd.Timestamp.now() - pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+    return df[df["date"] >= window_start].drop(columns=["aqi_24"]), window_start
+
+
+# Working Set, the run folds a few new raw objects per city into the persisted history
+def bench_read_s3(suite, s3_client, cities, df, new_per_city):
+    import aqi_fetch_data
+
+    window_df, window_start = working_window(df)
+    new_df = window_df.groupby("city").tail(new_per_city)
+    history_df = window_df.drop(new_df.index)
+    fixtures.seed_raw_objects(s3_client, new_df)
+
+    history_body = fixtures.parquet_bytes(history_df)
+    last_keys = {city_name: fixtures.raw_key(city_name, city_df["timestamp"].max()) for city_name, city_df in history_df.groupby("city")}
+
+    def reset_working_set():
+        # read_s3 advances the manifest, every repeat starts from the same checkpoint
+        s3_client.put_object(Bucket=fixtures.bucket_name, Key=f"{fixtures.s3_prefix}/data/working/history.snappy.parquet", Body=history_body)
+        aqi_fetch_data.write_manifest(s3_client, {"last_keys": last_keys, "window_start": window_start})
+
+    suite.run("read_s3.new_objects", lambda: aqi_fetch_data.read_s3(cities), setup=reset_working_set,
+              history_rows=len(history_df), new_objects=len(new_df))
+    suite.run("read_s3.no_new_objects", lambda: aqi_fetch_data.read_s3(cities), history_rows=len(history_df))
+
+
+# CPCB Aggregation, as run by the lambda over the working set
+def bench_cpcb_aggregation(suite, df):
+    import aqi_fetch_data
+    from aqi_engine import load_breakpoints
+    from cpcb_aggregator import CPCBAggregator
+
+    breakpoints = load_breakpoints(fixtures.breakpoint_csv)
+    window_df, _ = working_window(df)
+
+    def aggregate(state=None):
+        aggregator = CPCBAggregator(state).update_from_frame(window_df)
+        return {city_name: aqi_fetch_data.calculate_aqi(aggregator.city(city_name).aqi_inputs(), breakpoints)[0] for city_name in window_df["city"].unique()}
+
+    # Persisted state holds everything but each city's latest reading
+    previous_state = json.dumps(CPCBAggregator().update_from_frame(window_df.drop(window_df.groupby("city").tail(1).index)).to_dict())
+    suite.run("cpcb_aggregation.rebuild", aggregate, rows=len(window_df))
+    suite.run("cpcb_aggregation.incremental", lambda: aggregate(json.loads(previous_state)), rows=len(window_df))
+
+
+# End to End Lambda run with stubbed sources
+def bench_lambda_handler(suite, cities):
+    import aqi_fetch_data
+    suite.run("lambda_handler.end_to_end", aqi_fetch_data.lambda_handler, cities=len(cities))
+
+
+# Dashboard, reading the final layer and serving every callback
+def bench_app(suite, s3_client, cities, df):
+    import final_store
+
+    # Final layer and a small model published the way the lambdas do
+    final_path = f"s3://{fixtures.bucket_name}/{fixtures.s3_prefix}/data/final"
+    fixtures.seed_final_layer(s3_client, df)
+    suite.run("final_store.publish_base", lambda: final_store.publish_final(s3_client, df, final_path),
+              setup=lambda: fixtures.clear_prefix(s3_client, f"{fixtures.s3_prefix}/data/final/"), rows=len(df))
+    fixtures.seed_model(s3_client, df, cities[0]["city"])
+
+    # Importing the app starts the model registry and the shared cache, it can only be timed once per process
+    start = time.perf_counter()
+    import app
+    if suite.wants("app.import"):
+        suite.results["app.import"] = {"repeats": 1, "number": 1, "median_s": time.perf_counter() - start}
+        print(f"{'app.import':<45} median {suite.results['app.import']['median_s'] * 1000:10.3f} ms")
+
+    from final_store import FinalReader
+    from shared_cache import SharedDataCache
+    data, _ = app.data_cache.snapshot()
+    city_name = cities[0]["city"]
+
+    suite.run("app.final_reader.cold", lambda: FinalReader(final_path, s3_client_kwargs={"region_name": fixtures.aws_region}).read(), rows=len(data))
+    suite.run("app.get_data.new_worker", lambda: SharedDataCache(app.load_final_data, app.data_cache.cache_dir).get(), rows=len(data))
+    suite.run("app.get_data.warm", app.get_data, number=1000, rows=len(data))
+    suite.run("app.build_forecasts", lambda: app.build_forecasts(data, app.model_registry.model), cities=len(cities))
+
+    # Callbacks, cold computes the view model for the data version, warm serves it from the cache
+    callbacks = {
+        "update_city_options": lambda: app.update_city_options(None, city_name),
+        "update_aqi_line_chart": lambda: app.update_aqi_line_chart(None, None, city_name, None),
+        "update_aqi_measures": lambda: app.update_aqi_measures(None, city_name),
+        "update_prominent_pollutant_flag": lambda: app.update_prominent_pollutant_flag(None, city_name),
+        "update_aqi_predicted_count": lambda: app.update_aqi_predicted_count(None, city_name)
+    }
+    for name, callback in callbacks.items():
+        suite.run(f"app.{name}.cold", callback, setup=app.view_models.clear)
+        suite.run(f"app.{name}.warm", callback, number=100)
+
+    # Chart patch for a client that is one reading behind
+    _, chart_state = app.update_aqi_line_chart(None, None, city_name, None)
+    behind_state = {**chart_state, "last_timestamp": (pd.Timestamp(chart_state["last_timestamp"]) - pd.Timedelta(minutes=5)).isoformat()}
+    suite.run("app.update_aqi_line_chart.patch", lambda: app.update_aqi_line_chart(None, None, city_name, behind_state), number=100)
+
+
+# Regression Check against a previous results file
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result["median_s"] / baseline[name]["median_s"]
+            if ratio > 1 + tolerance:
+                regressions.append(name)
+            print(f"{name:<45} {ratio:6.2f}x baseline{'   REGRESSION' if ratio > 1 + tolerance else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the ingestion and dashboard hot paths against synthetic data, a local s3 and stubbed sources")
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--days", type=float, default=60, help="days of 5 minute readings generated per city")
+    parser.add_argument("--new-objects", type=int, default=6, help="raw objects per city folded in by read_s3")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="seconds each stubbed source takes to answer")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name starts with one of these")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="previous results file, exits non zero when a median regresses past the tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Local services and credentials have to be in place before the modules read them at import
+    server = fixtures.start_local_s3()
+    os.environ.update({
+        "GOOGLE_API_KEY": "benchmark",
+        "WEATHER_API_KEY": "benchmark",
+        "DATA_CACHE_DIR": tempfile.mkdtemp(prefix="aqi_bench_"),
+        "DATA_REFRESH_INTERVAL": "3600",
+        "MODEL_POLL_INTERVAL": "3600"
+    })
+
+    import boto3
+    s3_client = boto3.client("s3", region_name=fixtures.aws_region)
+    cities = fixtures.synthetic_cities(args.cities)
+    df = fixtures.synthetic_readings(cities, args.days)
+    fixtures.create_bucket(s3_client)
+    fixtures.seed_resources(s3_client, cities)
+    print(f"synthetic readings: {len(df)} rows, {len(cities)} cities, {args.days} days")
+
+    suite = Suite(args.repeats, args.only)
+    try:
+        if suite.wants("calculate_aqi"):
+            bench_calculate_aqi(suite, df)
+        if suite.wants("fetch_cities", "lambda_handler"):
+            bench_fetch_cities(suite, cities, args.http_latency)
+        if suite.wants("read_s3"):
+            bench_read_s3(suite, s3_client, cities, df, args.new_objects)
+        if suite.wants("cpcb_aggregation"):
+            bench_cpcb_aggregation(suite, df)
+        if suite.wants("lambda_handler"):
+            bench_lambda_handler(suite, cities)
+        if suite.wants("final_store", "app"):
+            bench_app(suite, s3_client, cities, df)
+    finally:
+        server.stop()
+
+    output = {
+        "meta": {
+            "created": pd.Timestamp.now(tz="UTC").isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "parameters": vars(args)
+        },
+        "results": suite.results
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(suite.results, args.baseline, args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Importing Libraries
+import numpy as np
+import pandas as pd
+
+
+# Time Window ending at the latest reading
+def time_window(df, hours, time_column="timestamp"):
+    max_time = df[time_column].max()
+    return df[df[time_column] >= max_time - pd.Timedelta(hours=hours)]
+
+
+# Largest Triangle Three Buckets
+# Keeps the first and last point and, per bucket, the point forming the largest triangle with its neighbours
+def lttb_indices(x, y, threshold):
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype="int64")
+    indices[0] = 0
+    indices[-1] = n - 1
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        next_start, next_end = end, bucket_edges[bucket + 2] if bucket + 2 < len(bucket_edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def downsample_series(df, x_column, y_columns, point_budget):
+    # Each series is reduced on its own, returned in long format for px.line
+    x = df[x_column].to_numpy().astype("datetime64[ns]").astype("int64")
+    series = []
+    for y_column in y_columns:
+        y_values = df[y_column].to_numpy(dtype="float64")
+        valid = ~np.isnan(y_values)
+        keep = np.flatnonzero(valid)[lttb_indices(x[valid], y_values[valid], point_budget)]
+        series.append(pd.DataFrame({x_column: df[x_column].to_numpy()[keep], "variable": y_column, "value": y_values[keep]}))
+    return pd.concat(series, ignore_index=True)
@@ -0,0 +1,157 @@
+# Importing Libraries
+import math
+from collections import deque
+import pandas as pd
+
+# CPCB Averaging Periods
+average_24hr_pollutants = ["pm2_5", "pm10", "so2", "no2"]
+rolling_8hr_pollutants = ["co", "o3"]
+rolling_window = pd.Timedelta(hours=8)
+
+
+# Streaming CPCB Aggregator for one City
+# Keeps running sums and counts for the day's averages and an 8 hour window of readings for the rolling means,
+# so every reading is an O(1) amortised update regardless of how much history is kept
+class CityAggregator:
+    def __init__(self, state=None):
+        state = state or {}
+        self.date = state.get("date")
+        self.last_timestamp = pd.Timestamp(state["last_timestamp"]) if state.get("last_timestamp") else None
+        self.last_values = state.get("last_values", {})
+        self.day_sums = state.get("day_sums", {p: 0.0 for p in average_24hr_pollutants})
+        self.day_counts = state.get("day_counts", {p: 0 for p in average_24hr_pollutants})
+        self.window = deque((pd.Timestamp(t), values) for t, values in state.get("window", []))
+        self.window_sums = state.get("window_sums", {p: 0.0 for p in rolling_8hr_pollutants})
+        self.window_counts = state.get("window_counts", {p: 0 for p in rolling_8hr_pollutants})
+        self.day_max = state.get("day_max", {p: None for p in rolling_8hr_pollutants})
+        self.previous_day_max = state.get("previous_day_max", dict(self.day_max))
+
+    def to_dict(self):
+        return {
+            "date": self.date,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            "last_values": self.last_values,
+            "day_sums": self.day_sums,
+            "day_counts": self.day_counts,
+            "window": [[t.isoformat(), values] for t, values in self.window],
+            "window_sums": self.window_sums,
+            "window_counts": self.window_counts,
+            "day_max": self.day_max,
+            "previous_day_max": self.previous_day_max
+        }
+
+    @staticmethod
+    def _valid(value):
+        return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+    def _retract_last(self):
+        # A revised reading for the same timestamp replaces the previous one
+        if self.last_values.get("date") == self.date:
+            for p in average_24hr_pollutants:
+                if self._valid(self.last_values.get(p)):
+                    self.day_sums[p] -= self.last_values[p]
+                    self.day_counts[p] -= 1
+        if self.window and self.window[-1][0] == self.last_timestamp:
+            _, values = self.window.pop()
+            for p in rolling_8hr_pollutants:
+                if self._valid(values.get(p)):
+                    self.window_sums[p] -= values[p]
+                    self.window_counts[p] -= 1
+        self.day_max = dict(self.previous_day_max)
+
+    def update(self, timestamp, values):
+        timestamp = pd.Timestamp(timestamp)
+        if self.last_timestamp is not None:
+            if timestamp < self.last_timestamp:
+                return False
+            if timestamp == self.last_timestamp:
+                self._retract_last()
+
+        # New day resets the averages and the daily maximum, the rolling window carries over midnight
+        date = timestamp.date().isoformat()
+        if date != self.date:
+            self.date = date
+            self.day_sums = {p: 0.0 for p in average_24hr_pollutants}
+            self.day_counts = {p: 0 for p in average_24hr_pollutants}
+            self.day_max = {p: None for p in rolling_8hr_pollutants}
+
+        for p in average_24hr_pollutants:
+            if self._valid(values.get(p)):
+                self.day_sums[p] += float(values[p])
+                self.day_counts[p] += 1
+
+        # Readings at or before timestamp - 8h leave the window, matching pandas rolling("8h")
+        while self.window and self.window[0][0] <= timestamp - rolling_window:
+            _, old_values = self.window.popleft()
+            for p in rolling_8hr_pollutants:
+                if self._valid(old_values.get(p)):
+                    self.window_sums[p] -= old_values[p]
+                    self.window_counts[p] -= 1
+
+        window_values = {p: float(values[p]) for p in rolling_8hr_pollutants if self._valid(values.get(p))}
+        self.window.append((timestamp, window_values))
+        self.previous_day_max = dict(self.day_max)
+        for p, value in window_values.items():
+            self.window_sums[p] += value
+            self.window_counts[p] += 1
+        for p in rolling_8hr_pollutants:
+            if self.window_counts[p]:
+                rolling_mean = self.window_sums[p] / self.window_counts[p]
+                if self.day_max[p] is None or rolling_mean > self.day_max[p]:
+                    self.day_max[p] = rolling_mean
+
+        self.last_timestamp = timestamp
+        self.last_values = {"date": date, **{p: float(values[p]) for p in average_24hr_pollutants if self._valid(values.get(p))}}
+        return True
+
+    def aqi_inputs(self):
+        # Same column order as the batch aggregation, 24 hour averages followed by 8 hour maxima
+        inputs = {p: self.day_sums[p] / self.day_counts[p] if self.day_counts[p] else float("nan") for p in average_24hr_pollutants}
+        inputs.update({p: self.day_max[p] if self.day_max[p] is not None else float("nan") for p in rolling_8hr_pollutants})
+        return pd.DataFrame([inputs])
+
+
+# Aggregators for every City, persisted as one JSON document
+class CPCBAggregator:
+    def __init__(self, state=None):
+        self.cities = {city: CityAggregator(city_state) for city, city_state in (state or {}).items()}
+
+    def to_dict(self):
+        return {city: aggregator.to_dict() for city, aggregator in self.cities.items()}
+
+    def city(self, city):
+        if city not in self.cities:
+            self.cities[city] = CityAggregator()
+        return self.cities[city]
+
+    def update_from_frame(self, df):
+        # Only readings at or after each city's last timestamp are applied
+        for city, city_df in df.groupby("city"):
+            aggregator = self.city(city)
+            if aggregator.last_timestamp is not None:
+                city_df = city_df[city_df["timestamp"] >= aggregator.last_timestamp]
+            for row in city_df.sort_values("timestamp").to_dict("records"):
+                aggregator.update(row["timestamp"], row)
+        return self
+
+
+# Batch Equivalent for Backfills
+# Every row gets the inputs the streaming aggregator would have produced right after that reading,
+# computed with grouped cumulative sums and a time based rolling window instead of one update per row
+def rolling_aqi_inputs(df):
+    df = df.sort_values(["city", "timestamp"]).drop_duplicates(["city", "timestamp"], keep="last").reset_index(drop=True)
+    timestamps = pd.to_datetime(df["timestamp"])
+    day_keys = [df["city"], timestamps.dt.date]
+
+    inputs = pd.DataFrame(index=df.index)
+    for p in average_24hr_pollutants:
+        values = df[p].astype("float64")
+        inputs[p] = values.fillna(0).groupby(day_keys).cumsum() / values.notna().groupby(day_keys).cumsum()
+
+    # Rows are sorted by city and time, so the grouped rolling result lines up with them positionally
+    window_df = pd.DataFrame({"city": df["city"], "timestamp": timestamps})
+    for p in rolling_8hr_pollutants:
+        window_df[p] = df[p].astype("float64")
+        rolling_mean = pd.Series(window_df.groupby("city").rolling(rolling_window, on="timestamp")[p].mean().to_numpy(), index=df.index)
+        inputs[p] = rolling_mean.groupby(day_keys).cummax().groupby(day_keys).ffill()
+    return df, inputs
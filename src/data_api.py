@@ -0,0 +1,135 @@
+# Importing Libraries
+import gzip
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+from flask import Response
+from history_schema import display_floats
+
+# Page Sizes and Compression
+page_size_default = 1000
+page_size_max = 5000
+gzip_min_bytes = 1024
+gzip_level = 6
+
+
+class ApiError(ValueError):
+    pass
+
+
+# Rendered Responses per Data Version
+# Bodies are rendered, hashed and compressed once per version and query, a conditional
+# request that matches is answered from the cached ETag without touching the frame
+class ResponseCache:
+    def __init__(self, size=256):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        entry = self._entries.get(key)
+        if entry is None:
+            body = build().encode("utf-8")
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            compressed = gzip.compress(body, gzip_level, mtime=0) if len(body) >= gzip_min_bytes else None
+            entry = (etag, body, compressed)
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return entry
+
+
+def respond(request, cache, key, build, max_age):
+    etag, body, compressed = cache.get(key, build)
+
+    # Each encoding is its own representation with its own strong ETag
+    use_gzip = compressed is not None and "gzip" in request.accept_encodings
+    if use_gzip:
+        etag, body = f"{etag}-gzip", compressed
+
+    headers = {"Cache-Control": f"public, max-age={max_age}", "Vary": "Accept-Encoding", "ETag": f'"{etag}"'}
+
+    # If-None-Match uses the weak comparison, so a proxy that weakened the tag still revalidates
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, content_type="application/json", headers=headers)
+
+
+def error_response(message, status=400):
+    return Response(json.dumps({"error": message}), status=status, content_type="application/json")
+
+
+# Query Parameters
+def parse_time(value, tz):
+    if not value:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError:
+        raise ApiError(f"Invalid timestamp: {value}")
+    if tz is not None and timestamp.tzinfo is None:
+        return timestamp.tz_localize(tz)
+    if tz is None and timestamp.tzinfo is not None:
+        return timestamp.tz_localize(None)
+    return timestamp
+
+
+def parse_limit(value):
+    try:
+        limit = int(value) if value else page_size_default
+    except ValueError:
+        raise ApiError(f"Invalid limit: {value}")
+    return min(max(limit, 1), page_size_max)
+
+
+# Cursors name the last row of a page, so the next page starts after it even when new versions arrive in between
+def encode_cursor(city, timestamp):
+    return base64.urlsafe_b64encode(json.dumps([city, timestamp.isoformat()]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, tz):
+    try:
+        city, timestamp = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ApiError("Invalid cursor")
+    return city, parse_time(timestamp, tz)
+
+
+# Payloads
+def rows_json(df):
+    return display_floats(df).to_json(orient="records", date_format="iso", date_unit="s")
+
+
+def latest_body(df, version):
+    # The final frame is sorted by city and timestamp, the last row per city is its latest reading
+    latest = df.groupby("city", sort=True).tail(1)
+    return f'{{"version": {json.dumps(version)}, "rows": {rows_json(latest)}}}'
+
+
+def history_body(df, version, city, start, end, cursor, limit):
+    tz = df["timestamp"].dt.tz
+    start, end = parse_time(start, tz), parse_time(end, tz)
+
+    # city is categorical, ordering against the cursor needs its values
+    cities = df["city"].astype(str)
+    mask = pd.Series(True, index=df.index)
+    if city:
+        mask &= cities == city
+    if start is not None:
+        mask &= df["timestamp"] >= start
+    if end is not None:
+        mask &= df["timestamp"] <= end
+    if cursor:
+        cursor_city, cursor_time = decode_cursor(cursor, tz)
+        mask &= (cities > cursor_city) | ((cities == cursor_city) & (df["timestamp"] > cursor_time))
+
+    rows = df[mask].sort_values(["city", "timestamp"])
+    page = rows.head(limit)
+    next_cursor = encode_cursor(str(page["city"].iloc[-1]), page["timestamp"].iloc[-1]) if len(rows) > limit else None
+    return f'{{"version": {json.dumps(version)}, "next_cursor": {json.dumps(next_cursor)}, "rows": {rows_json(page)}}}'
@@ -0,0 +1,118 @@
+# Importing Libraries
+import io, json
+import threading
+from datetime import timedelta
+import pandas as pd
+
+# Final Layer Layout
+# latest.json is the small commit object, it names one base snapshot and the deltas appended after it
+latest_name = "latest.json"
+base_every = 48
+
+
+def split_location(location):
+    bucket_name = location.split("/")[2]
+    key = "/".join(location.split("/")[3:])
+    return bucket_name, key
+
+
+def read_latest(s3_client, final_data_path):
+    bucket_name, key = split_location(f"{final_data_path}/{latest_name}")
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(response["Body"].read())
+
+
+def write_parquet(s3_client, df, bucket_name, key):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", index=False)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+    return key
+
+
+# Writer, publishes only the rows changed since the last version
+def publish_final(s3_client, df, final_data_path):
+    latest = read_latest(s3_client, final_data_path) or {"version": 0, "base": None, "deltas": [], "published_until": {}, "previous": []}
+    version = latest["version"] + 1
+    bucket_name, prefix = split_location(final_data_path)
+
+    if latest["base"] is None or len(latest["deltas"]) >= base_every:
+        base = write_parquet(s3_client, df, bucket_name, f"{prefix}/base/base_{version:010d}.snappy.parquet")
+        deltas = []
+
+        # Objects two generations back are no longer referenced by any reader
+        for old_key in latest.get("previous", []):
+            s3_client.delete_object(Bucket=bucket_name, Key=old_key)
+        previous = [key for key in [latest["base"]] + latest["deltas"] if key is not None]
+    else:
+        # Rows at or after the last published timestamp, so revised readings of that hour are republished
+        published_until = pd.to_datetime(df["city"].map(latest["published_until"]))
+        delta_df = df[published_until.isna() | (df["timestamp"] >= published_until)]
+        delta = write_parquet(s3_client, delta_df, bucket_name, f"{prefix}/deltas/delta_{version:010d}.snappy.parquet")
+
+        base = latest["base"]
+        deltas = latest["deltas"] + [delta]
+        previous = latest.get("previous", [])
+
+    published_until = {city: timestamp.isoformat() for city, timestamp in df.groupby("city")["timestamp"].max().items()}
+    new_latest = {"version": version, "base": base, "deltas": deltas, "published_until": published_until, "previous": previous}
+
+    # latest.json is written last, it is the commit point for readers
+    latest_bucket, latest_key = split_location(f"{final_data_path}/{latest_name}")
+    s3_client.put_object(Bucket=latest_bucket, Key=latest_key, Body=json.dumps(new_latest).encode("utf-8"),
+                         ContentType="application/json")
+    return version
+
+
+# Reader, keeps the frame in memory and fetches only what changed since its last version
+class FinalReader:
+    def __init__(self, final_data_path, s3_client_kwargs=None, retention=timedelta(days=7)):
+        self.final_data_path = final_data_path
+        self.bucket_name = split_location(final_data_path)[0]
+        self.s3_client_kwargs = s3_client_kwargs or {}
+        self.retention = retention
+
+        self.version = None
+        self.base = None
+        self.applied = []
+        self.df = None
+        self._lock = threading.Lock()
+        self._s3_client = None
+
+    def _client(self):
+        # boto3 is imported on first use so importing the reader stays cheap
+        if self._s3_client is None:
+            import boto3
+            self._s3_client = boto3.client("s3", **self.s3_client_kwargs)
+        return self._s3_client
+
+    def _read_parquet(self, key):
+        response = self._client().get_object(Bucket=self.bucket_name, Key=key)
+        return pd.read_parquet(io.BytesIO(response["Body"].read()), engine="pyarrow")
+
+    def read(self):
+        with self._lock:
+            latest = read_latest(self._client(), self.final_data_path)
+            if latest is None or latest["version"] == self.version:
+                return self.df
+
+            if latest["base"] != self.base or self.df is None:
+                frames = [self._read_parquet(latest["base"])]
+                pending = latest["deltas"]
+            else:
+                frames = [self.df]
+                pending = latest["deltas"][len(self.applied):]
+
+            frames.extend(self._read_parquet(key) for key in pending)
+            df = pd.concat(frames, ignore_index=True)
+            df = df.drop_duplicates(["city", "timestamp"], keep="last")
+            df = df[df["timestamp"] > df["timestamp"].max() - self.retention]
+            df = df.sort_values(["city", "timestamp"]).reset_index(drop=True)
+
+            self.df = df
+            self.version = latest["version"]
+            self.base = latest["base"]
+            self.applied = list(latest["deltas"])
+            return self.df
@@ -0,0 +1,44 @@
+# Importing Libraries
+import numpy as np
+import pandas as pd
+
+# Compact Schema of the Dashboard's History Frame
+# Concentrations and weather fit float32, AQI values and wind direction int16, humidity int8,
+# the repeated strings are categoricals and become dictionary columns in the shared Arrow file
+history_dtypes = {
+    "pm2_5": "float32", "pm10": "float32", "so2": "float32", "co": "float32", "o3": "float32", "no2": "float32",
+    "aqi_in": "int16", "aqi_us": "int16", "aqi_24": "int16",
+    "temperature": "float32", "uv": "float32", "wind": "float32", "humidity": "int8", "wind_degree": "int16",
+    "city": "category", "prominent_pollutant": "category", "date": "category"
+}
+
+# Decimals each float32 column is shown and served with, rounded as float64 so 31.2 is not printed as 31.200001
+history_decimals = {
+    "pm2_5": 2, "pm10": 2, "so2": 2, "co": 3, "o3": 2, "no2": 2,
+    "temperature": 1, "uv": 1, "wind": 1
+}
+
+
+def fits_integer(values, dtype):
+    if values.dtype.kind in "iu":
+        return values.empty or (values.min() >= np.iinfo(dtype).min and values.max() <= np.iinfo(dtype).max)
+    values = pd.to_numeric(values, errors="coerce")
+    return bool(((values % 1 == 0) & values.between(np.iinfo(dtype).min, np.iinfo(dtype).max)).all())
+
+
+def compact_history(df):
+    dtypes = {}
+    for column, dtype in history_dtypes.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        # An integer cast would truncate fractions and wrap values out of range, gaps included those columns stay float32
+        if dtype.startswith("int") and not fits_integer(df[column], dtype):
+            dtype = "float32"
+        dtypes[column] = dtype
+    return df.astype(dtypes)
+
+
+def display_floats(df):
+    columns = {column: df[column].astype("float64").round(decimals) for column, decimals in history_decimals.items()
+               if column in df.columns and df[column].dtype == "float32"}
+    return df.assign(**columns) if columns else df
@@ -0,0 +1,83 @@
+# Importing Libraries
+import json
+import numpy as np
+import pandas as pd
+
+# Feature Schema Version published next to the model
+schema_version = "1"
+
+
+def model_schema(booster, features):
+    return {
+        "schema_version": schema_version,
+        "format": "ubj",
+        "features": list(features),
+        "trained_until": booster.attr("trained_until"),
+        "params": json.loads(booster.attr("params")) if booster.attr("params") else None,
+        "num_boosted_rounds": booster.num_boosted_rounds()
+    }
+
+
+def load_booster(raw):
+    # xgboost is only imported once a model is actually loaded
+    import xgboost as xgb
+    booster = xgb.Booster()
+    booster.load_model(bytearray(raw))
+    return booster
+
+
+# Fast Inference through the native Booster
+# Scores NumPy batches with inplace_predict, no DataFrame or DMatrix is built per call
+class AQIPredictor:
+    def __init__(self, booster, features):
+        self.booster = booster
+        self.features = list(features)
+        self.feature_index = {feature: i for i, feature in enumerate(self.features)}
+
+    @classmethod
+    def from_bytes(cls, body, metadata=None):
+        booster = load_booster(body.read())
+        metadata = metadata or {}
+        if "features" in metadata:
+            features = json.loads(metadata["features"])
+        else:
+            features = booster.feature_names
+        return cls(booster, features)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype="float32")
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.features):
+            raise ValueError(f"Expected {len(self.features)} features {self.features}, got {X.shape[1]}")
+        return self.booster.inplace_predict(X)
+
+    def predict_frame(self, df):
+        return self.predict(df[self.features].to_numpy(dtype="float32"))
+
+    def forecast(self, base_values, aqi_lags, start_times, horizon=24):
+        # Recursive multi horizon forecast, each step scores every series in one batch and
+        # feeds its predictions back as aqi_lag1..3 for the next hour, step k is start + k hours
+        start_times = pd.DatetimeIndex(start_times)
+        X = np.zeros((len(start_times), len(self.features)), dtype="float32")
+        for feature, values in base_values.items():
+            X[:, self.feature_index[feature]] = values
+
+        lags = np.asarray(aqi_lags, dtype="float32").copy()
+        predictions = np.empty((len(start_times), horizon), dtype="float32")
+        for step in range(horizon):
+            times = start_times + pd.Timedelta(hours=step + 1)
+            X[:, self.feature_index["month"]] = times.month
+            X[:, self.feature_index["day"]] = times.day
+            X[:, self.feature_index["hour"]] = times.hour
+            X[:, self.feature_index["aqi_lag1"]] = lags[:, 0]
+            X[:, self.feature_index["aqi_lag2"]] = lags[:, 1]
+            X[:, self.feature_index["aqi_lag3"]] = lags[:, 2]
+
+            predictions[:, step] = self.booster.inplace_predict(X)
+            lags = np.column_stack([predictions[:, step], lags[:, 0], lags[:, 1]])
+        return predictions
+
+    def vector(self, values):
+        # One row in schema order from a feature to value mapping
+        return np.array([values[feature] for feature in self.features], dtype="float32")
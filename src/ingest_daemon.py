@@ -0,0 +1,124 @@
+# Importing Libraries
+import os
+import time
+import logging
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from aqi_engine import load_breakpoints
+from metrics import span, timed, add_observer, log_observer
+from storage_config import pollutant_breakpoints, city_registry, load_cities
+from storage_config import aws_region, aws_access_key_id, aws_secret_access_key
+from aqi_fetch_data import city_concurrency, http_session
+from aqi_fetch_data import fetch_cities, raw_to_s3, read_s3, read_aggregator, aggregator_to_s3, final_to_s3, read_manifest
+from aqi_fetch_data import working_window_start, tag_raw_frames, merge_working_set, advance_last_keys, write_working_set, enrich_working_set
+
+logger = logging.getLogger(__name__)
+
+# Schedule, runs start on a fixed grid of the interval from the daemon's start
+ingest_interval = float(os.environ.get("INGEST_INTERVAL", 60))
+# Raw readings and the final layer are written every run, the working set, manifest and aggregator
+# state every few runs, a restart folds the raw objects written after the last checkpoint back in
+ingest_checkpoint_every = int(os.environ.get("INGEST_CHECKPOINT_EVERY", 10))
+
+
+# Ingestion Daemon, replaces the scheduled Lambda, only one instance should run against a bucket
+class IngestionDaemon:
+    def __init__(self, interval=ingest_interval, checkpoint_every=ingest_checkpoint_every):
+        self.interval = interval
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.stopping = threading.Event()
+        self.runs = 0
+
+        self.s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
+                                      aws_secret_access_key=aws_secret_access_key)
+        self.session = http_session
+        self.load_resources()
+
+        # Working set as the last Lambda run or checkpoint left it, plus any raw objects written since
+        with span("daemon.restore"):
+            self.df = read_s3(self.cities)
+            self.last_keys = read_manifest(self.s3_client)["last_keys"]
+            self.window_start = working_window_start()
+            self.aggregator = read_aggregator(self.s3_client)
+        self.dirty = False
+
+    def load_resources(self):
+        self.breakpoints = load_breakpoints(pollutant_breakpoints)
+        self.cities = load_cities(city_registry)
+
+    @timed("daemon.run")
+    def run_once(self):
+        with span("fetch", cities=len(self.cities)):
+            raw_dfs = fetch_cities(self.breakpoints, self.cities, session=self.session)
+
+        with ThreadPoolExecutor(max_workers=city_concurrency) as executor:
+            raw_keys = dict(zip(raw_dfs, executor.map(lambda item: raw_to_s3(item[1], item[0], self.s3_client), raw_dfs.items())))
+
+        # Merged into the in memory working set, nothing is read back from s3
+        self.window_start = working_window_start()
+        city_names = [city["city"] for city in self.cities]
+        self.df = merge_working_set([self.df] + tag_raw_frames(raw_dfs, raw_keys), self.window_start, city_names)
+        self.last_keys = advance_last_keys(self.last_keys, raw_keys.values())
+        self.dirty = True
+
+        # The working set is kept without derived columns, the same shape as the persisted history
+        df = enrich_working_set(self.df.copy(), self.aggregator, self.breakpoints)
+        final_to_s3(df, self.s3_client)
+
+        self.runs += 1
+        if self.runs % self.checkpoint_every == 0:
+            self.checkpoint()
+            self.load_resources()
+        return len(raw_dfs)
+
+    @timed("daemon.checkpoint")
+    def checkpoint(self):
+        if not self.dirty:
+            return False
+        write_working_set(self.s3_client, self.df, self.last_keys, self.window_start)
+        aggregator_to_s3(self.s3_client, self.aggregator)
+        self.dirty = False
+        return True
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run_forever(self):
+        # Runs happen one after another on this thread, so they never overlap.
+        # Each run is scheduled against the fixed grid instead of the end of the previous one, so
+        # the cadence does not drift, and slots missed by an overrunning run are skipped, not queued
+        start = time.monotonic()
+        slot = 0
+        while not self.stopping.is_set():
+            lag = time.monotonic() - (start + slot * self.interval)
+            try:
+                with span("daemon.tick", slot=slot, lag_ms=round(lag * 1000, 1)):
+                    self.run_once()
+            except Exception:
+                logger.exception("Ingestion run %s failed", slot)
+
+            slot = max(slot + 1, int((time.monotonic() - start) // self.interval) + 1)
+            self.stopping.wait(max(0.0, start + slot * self.interval - time.monotonic()))
+
+        self.checkpoint()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch every city on a fixed sub-minute schedule, keeping the working set in memory")
+    parser.add_argument("--interval", type=float, default=ingest_interval, help="seconds between run starts")
+    parser.add_argument("--checkpoint-every", type=int, default=ingest_checkpoint_every, help="runs between working set checkpoints")
+    parser.add_argument("--once", action="store_true", help="run a single ingestion and checkpoint")
+    args = parser.parse_args()
+    add_observer(log_observer)
+
+    daemon = IngestionDaemon(args.interval, args.checkpoint_every)
+    if args.once:
+        daemon.run_once()
+        daemon.checkpoint()
+    else:
+        signal.signal(signal.SIGTERM, daemon.stop)
+        signal.signal(signal.SIGINT, daemon.stop)
+        daemon.run_forever()
@@ -0,0 +1,104 @@
+# Importing Libraries
+import os
+import json
+import time
+import functools
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+# Metrics Switch, read once at import so a disabled process only pays for a flag check per span
+metrics_enabled = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+metrics_prefix = "aqi"
+
+# Every finished span is handed to each observer as (stage, seconds, status, fields)
+observers = []
+disabled_span = nullcontext()
+
+
+# Stage Timing
+class Span:
+    __slots__ = ("stage", "fields", "start")
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        status = "ok" if exc_type is None else "error"
+        for observer in observers:
+            observer(self.stage, seconds, status, self.fields)
+        return False
+
+
+def span(stage, **fields):
+    if not metrics_enabled:
+        return disabled_span
+    return Span(stage, fields)
+
+
+def timed(stage):
+    # Decorated functions are left untouched when metrics are disabled
+    def decorator(func):
+        if not metrics_enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(stage, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_observer(observer):
+    if metrics_enabled and observer not in observers:
+        observers.append(observer)
+    return observer
+
+
+# Structured Logs, one JSON line per span for the Lambda's log stream
+def log_observer(stage, seconds, status, fields):
+    record = {
+        "metric": f"{metrics_prefix}_stage_duration",
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "stage": stage,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 3),
+        **fields
+    }
+    print(json.dumps(record, default=str), flush=True)
+
+
+# Prometheus Histograms and Counters for the dashboard server
+# With PROMETHEUS_MULTIPROC_DIR set every gunicorn worker writes its samples there and the endpoint merges them
+def prometheus_metrics():
+    if not metrics_enabled:
+        return None
+
+    from prometheus_client import Counter, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+
+    stage_duration = Histogram(
+        f"{metrics_prefix}_stage_duration_seconds", "Time spent in each stage", ["stage"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    )
+    stage_total = Counter(f"{metrics_prefix}_stage", "Completed stages by outcome", ["stage", "status"])
+
+    def observer(stage, seconds, status, fields):
+        stage_duration.labels(stage).observe(seconds)
+        stage_total.labels(stage, status).inc()
+
+    def exposition():
+        registry = REGISTRY
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    add_observer(observer)
+    return exposition
@@ -1,12 +1,14 @@
 # Importing Libraries
-import io, os
+import io, os, sys
+import json
 import boto3
 import requests
 import pandas as pd
 from datetime import *
-import joblib
 from xgboost import XGBRegressor
 from dotenv import load_dotenv
+from aqi_engine import load_breakpoints, score_aqi
+from inference import load_booster, model_schema
 
 # Loading Environment
 load_dotenv()
@@ -19,12 +21,36 @@ for key, value in os.environ.items():
 # s3 Location
 s3_resource_path = "s3://github-projects-resume/Real_Time_Analytical_Dashboard/resources"
 pollutant_breakpoints = f"{s3_resource_path}/aqi_concentration_breakpoints.csv"
-
-
-def get_training_data():
-    start_date = "2023-01-01"
-    end_date = (datetime.now() - timedelta(days=1)).date()
-
+training_data_cache = f"{s3_resource_path}/training_data.snappy.parquet"
+model_location = f"{s3_resource_path}/aqi_ml_model.ubj"
+model_schema_location = f"{s3_resource_path}/aqi_ml_model.schema.json"
+
+# Training Configuration
+training_start_date = date(2023, 1, 1)
+feature_columns = ["pm10", "pm2_5", "co", "no2", "o3", "so2", "month", "day", "hour", "aqi_lag1", "aqi_lag2", "aqi_lag3"]
+best_params = {
+    "subsample": 1.0,
+    "reg_lambda": 0.1,
+    "reg_alpha": 0.01,
+    "n_estimators": 300,
+    "min_child_weight": 5,
+    "max_depth": 9,
+    "learning_rate": 0.05,
+    "gamma": 0.5,
+    "colsample_bytree": 1.0,
+    "objective": "reg:squarederror"
+}
+warm_start_rounds = 25
+max_boosting_rounds = 600
+
+# Tuning Mode, a time ordered search over a process pool within a fixed budget in seconds
+tuning_candidates = int(os.environ.get("TUNING_CANDIDATES", 40))
+tuning_folds = int(os.environ.get("TUNING_FOLDS", 4))
+tuning_budget = int(os.environ.get("TUNING_BUDGET", 1800))
+tuning_workers = int(os.environ.get("TUNING_WORKERS", os.cpu_count() or 1))
+
+
+def fetch_training_data(start_date, end_date):
     url = f"https://air-quality-api.open-meteo.com/v1/air-quality?latitude={lat}&longitude={lon}&hourly=pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,ozone,sulphur_dioxide&start_date={start_date}&end_date={end_date}"
     response = requests.get(url)
 
@@ -44,95 +70,147 @@ def get_training_data():
     return df
 
 
-def calculate_aqi(row, breakpoint_df):
-    aqi_breakpoint = 0
-    for pollutant_key in ["pm10", "pm2_5", "co", "no2", "o3", "so2"]:
-
-        pollutant_value = round(row[pollutant_key])
-        breakpoint_pollutant_df = breakpoint_df[breakpoint_df["pollutant"] == pollutant_key]
+def get_training_data(s3_client, breakpoints):
+    end_date = (datetime.now() - timedelta(days=1)).date()
+    bucket_name = training_data_cache.split("/")[2]
+    key = "/".join(training_data_cache.split("/")[3:])
+
+    # Cached history, only the missing days are requested from the API
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+        cached_df = pd.read_parquet(io.BytesIO(response["Body"].read()), engine="pyarrow")
+        start_date = (cached_df["time"].max() - timedelta(hours=5, minutes=30)).date()
+    except s3_client.exceptions.NoSuchKey:
+        cached_df = pd.DataFrame()
+        start_date = training_start_date
+
+    if start_date > end_date:
+        return cached_df
+
+    # The last cached day is fetched again in case it was incomplete
+    df = fetch_training_data(start_date, end_date)
+    df["aqi"] = calculate_aqi(df, breakpoints)
+    df = pd.concat([cached_df, df], ignore_index=True)
+    df = df.drop_duplicates("time", keep="last").sort_values("time").reset_index(drop=True)
 
-        if pollutant_value < breakpoint_pollutant_df["low_concentration"].min():
-            breakpoint_row = breakpoint_pollutant_df.iloc[0]
-        elif pollutant_value > breakpoint_pollutant_df["upper_concentration"].max():
-            breakpoint_row = breakpoint_pollutant_df.iloc[-1]
-        else:
-            breakpoint_row = breakpoint_pollutant_df[
-                (breakpoint_pollutant_df["low_concentration"] <= pollutant_value) &
-                (breakpoint_pollutant_df["upper_concentration"] >= pollutant_value)
-                ].iloc[0]
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", index=False)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+    return df
 
-        c_low = breakpoint_row["low_concentration"]
-        c_high = breakpoint_row["upper_concentration"]
-        i_low = breakpoint_row["low_aqi"]
-        i_high = breakpoint_row["upper_aqi"]
 
-        aqi = ((i_high - i_low) / (c_high - c_low)) * (row[pollutant_key] - c_low) + i_low
-        if aqi > aqi_breakpoint:
-            aqi_breakpoint = aqi
-    return round(aqi_breakpoint, 2)
+def calculate_aqi(df, breakpoints):
+    aqi, prominent_pollutant = score_aqi(df, breakpoints, pollutants=["pm10", "pm2_5", "co", "no2", "o3", "so2"], rounding="round")
+    return pd.Series(aqi, index=df.index).round(2)
 
 
-def model_training(df):
+def training_features(df):
+    df = df.copy()
     df["aqi_lag1"] = df["aqi"].shift(1)
     df["aqi_lag2"] = df["aqi"].shift(2)
     df["aqi_lag3"] = df["aqi"].shift(3)
 
     df["target_aqi"] = df["aqi"].shift(-1)
-    df = df.dropna()
+    return df.dropna()
+
+
+def model_params(booster):
+    # Parameters published with the model, the defaults until a tuning run has published its own
+    if booster is not None and booster.attr("params") is not None:
+        return json.loads(booster.attr("params"))
+    return dict(best_params)
+
+
+def model_tuning(df):
+    from model_tuning import tune
 
-    X = df[["pm10", "pm2_5", "co", "no2", "o3", "so2", "month", "day", "hour", "aqi_lag1", "aqi_lag2", "aqi_lag3"]]
+    df = training_features(df)
+    params, results = tune(
+        df[feature_columns].to_numpy(), df["target_aqi"].to_numpy(), baseline_params=best_params,
+        n_candidates=tuning_candidates, n_folds=tuning_folds, max_rounds=max_boosting_rounds,
+        time_budget=tuning_budget, max_workers=tuning_workers
+    )
+    print(f"Tuning evaluated {len(results)} candidates, best rmse {results[0]['rmse']:.3f} with {params}")
+    return {**best_params, **params}
+
+
+def model_training(df, previous_booster=None, params=None):
+    params = params or best_params
+    df = training_features(df)
+    trained_until = str(df["time"].max())
+
+    # Warm start continues boosting from the published booster on the rows it has not seen yet
+    if previous_booster is not None:
+        previous_until = previous_booster.attr("trained_until")
+        if previous_until is not None and previous_booster.num_boosted_rounds() + warm_start_rounds <= max_boosting_rounds:
+            df = df[df["time"] > pd.Timestamp(previous_until)]
+            if df.empty:
+                return previous_booster
+
+            model = XGBRegressor(**{**params, "n_estimators": warm_start_rounds})
+            model.fit(df[feature_columns], df["target_aqi"], xgb_model=previous_booster)
+            model.get_booster().set_attr(trained_until=trained_until, params=json.dumps(params))
+            return model.get_booster()
+
+    # Full retrain
+    X = df[feature_columns]
     y = df["target_aqi"]
 
-    best_params = {
-        "subsample": 1.0,
-        "reg_lambda": 0.1,
-        "reg_alpha": 0.01,
-        "n_estimators": 300,
-        "min_child_weight": 5,
-        "max_depth": 9,
-        "learning_rate": 0.05,
-        "gamma": 0.5,
-        "colsample_bytree": 1.0,
-        "objective": "reg:squarederror"
-    }
-
-    model = XGBRegressor(**best_params)
+    model = XGBRegressor(**params)
     model.fit(X, y)
-    return model
+    model.get_booster().set_attr(trained_until=trained_until, params=json.dumps(params))
+    return model.get_booster()
 
 
-def model_to_s3(model):
-    buffer = io.BytesIO()
-    joblib.dump(model, buffer)
-    buffer.seek(0)
+def model_from_s3(s3_client):
+    bucket_name = model_location.split("/")[2]
+    key = "/".join(model_location.split("/")[3:])
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return load_booster(response["Body"].read())
 
-    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
-                             aws_secret_access_key=aws_secret_access_key)
 
-    file_location = f"{s3_resource_path}/aqi_ml_model.pkl"
-    bucket_name = file_location.split("/")[2]
-    key = "/".join(file_location.split("/")[3:])
+def model_to_s3(s3_client, booster):
+    # Native XGBoost binary with the feature schema as object metadata, plus the schema file next to it
+    schema = model_schema(booster, feature_columns)
+    metadata = {"features": json.dumps(schema["features"]), "schema_version": schema["schema_version"]}
 
-    s3_client.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+    bucket_name = model_schema_location.split("/")[2]
+    key = "/".join(model_schema_location.split("/")[3:])
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=json.dumps(schema).encode("utf-8"), ContentType="application/json")
+
+    bucket_name = model_location.split("/")[2]
+    key = "/".join(model_location.split("/")[3:])
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=bytes(booster.save_raw("ubj")), Metadata=metadata)
     return True
 
 
 def lambda_handler(event=None, context=None):
-    # CPCB Breakpoint Ranges
-    breakpoint_df = pd.read_csv(pollutant_breakpoints)
+    # Training Mode, warm start falls back to a full retrain when there is no usable previous model,
+    # tune searches for new parameters and retrains from scratch with the winner
+    mode = (event or {}).get("mode", "warm")
+    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id,
+                             aws_secret_access_key=aws_secret_access_key)
 
-    # Collect Training Data
-    df = get_training_data()
+    # CPCB Breakpoint Ranges
+    breakpoints = load_breakpoints(pollutant_breakpoints)
 
-    # AQI Calculation
-    df["aqi"] = df.apply(calculate_aqi, breakpoint_df=breakpoint_df, axis=1)
+    # Collect Training Data with AQI, from the cache plus the missing days
+    df = get_training_data(s3_client, breakpoints)
 
-    # Model Training
-    model = model_training(df)
+    # Model Training, with the parameters published alongside the current model
+    published_booster = model_from_s3(s3_client)
+    params = model_tuning(df) if mode == "tune" else model_params(published_booster)
+    previous_booster = published_booster if mode == "warm" else None
+    booster = model_training(df, previous_booster, params)
 
     # Save to s3
-    model_to_s3(model)
+    if booster is not previous_booster:
+        model_to_s3(s3_client, booster)
 
 
 if __name__ == "__main__":
-    lambda_handler()
\ No newline at end of file
+    # Tuning needs a multi core box rather than a Lambda, python ml_model_creation.py tune
+    lambda_handler({"mode": sys.argv[1]} if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,89 @@
+# Importing Libraries
+import threading
+import logging
+from io import BytesIO
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+# In Process Model Registry
+# Loads the model once per worker and swaps in a new one whenever the s3 object's ETag changes,
+# the loader receives the object body and its user metadata
+class ModelRegistry:
+    def __init__(self, file_location, loader, s3_client_kwargs=None, poll_interval=300):
+        self.bucket_name = file_location.split("/")[2]
+        self.key = "/".join(file_location.split("/")[3:])
+        self.s3_client_kwargs = s3_client_kwargs or {}
+        self.loader = loader
+        self.poll_interval = poll_interval
+
+        self._current = (None, None)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._s3_client = None
+
+    def _client(self):
+        # boto3 is imported on first use so importing the registry stays cheap
+        if self._s3_client is None:
+            import boto3
+            self._s3_client = boto3.client("s3", **self.s3_client_kwargs)
+        return self._s3_client
+
+    @property
+    def model(self):
+        return self._current[0]
+
+    @property
+    def version(self):
+        return self._current[1]
+
+    def snapshot(self):
+        return self._current
+
+    def refresh(self):
+        head = self._client().head_object(Bucket=self.bucket_name, Key=self.key)
+        version = head.get("VersionId") or head["ETag"]
+        if version == self.version:
+            return False
+
+        with span("model_load"):
+            obj = self._client().get_object(Bucket=self.bucket_name, Key=self.key, IfMatch=head["ETag"])
+            model = self.loader(BytesIO(obj["Body"].read()), obj.get("Metadata", {}))
+
+        # Single reference assignment so readers never see a half updated pair
+        self._current = (model, version)
+        logger.info("Loaded model %s version %s", self.key, version)
+        return True
+
+    def _poll(self, load_first):
+        if load_first:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Initial model load failed, retrying in %ss", self.poll_interval)
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Model refresh failed, keeping version %s", self.version)
+
+    def start(self, wait=True):
+        # Without wait the first load happens on the poll thread and model stays None until it lands
+        if self._thread is not None:
+            return self
+        if wait:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Initial model load failed, retrying in background")
+
+        self._thread = threading.Thread(target=self._poll, args=(not wait,), name="model-registry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,107 @@
+# Importing Libraries
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from scipy.stats import loguniform, uniform, randint
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+
+# Search Space, sampled at random within the budget
+search_space = {
+    "max_depth": randint(3, 11),
+    "learning_rate": loguniform(0.01, 0.3),
+    "min_child_weight": randint(1, 11),
+    "subsample": uniform(0.6, 0.4),
+    "colsample_bytree": uniform(0.6, 0.4),
+    "gamma": loguniform(1e-3, 1.0),
+    "reg_alpha": loguniform(1e-3, 1.0),
+    "reg_lambda": loguniform(1e-2, 10.0)
+}
+early_stopping_rounds = 30
+
+# Folds of the worker process, set once by the pool initializer instead of being pickled with every candidate
+worker_folds = None
+
+
+def time_series_folds(X, y, n_folds):
+    # Expanding window, every fold validates on the rows right after its training rows
+    import xgboost as xgb
+    folds = []
+    for train_index, valid_index in TimeSeriesSplit(n_splits=n_folds).split(X):
+        folds.append((xgb.DMatrix(X[train_index], label=y[train_index]), xgb.DMatrix(X[valid_index], label=y[valid_index])))
+    return folds
+
+
+def init_worker(X, y, n_folds):
+    global worker_folds
+    worker_folds = time_series_folds(X, y, n_folds)
+
+
+def deadline_callback(deadline):
+    # Stops boosting after the round that crosses the deadline, so a running candidate ends within one round
+    import xgboost as xgb
+
+    class Deadline(xgb.callback.TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            return time.time() > deadline
+    return Deadline()
+
+
+def evaluate_candidate(params, max_rounds, nthread, deadline):
+    # Mean validation RMSE over the folds, each fold stops boosting once validation stops improving
+    import xgboost as xgb
+    train_params = {**params, "objective": "reg:squarederror", "eval_metric": "rmse", "nthread": nthread}
+
+    scores, rounds = [], []
+    for dtrain, dvalid in worker_folds:
+        if time.time() > deadline:
+            return None
+        booster = xgb.train(train_params, dtrain, num_boost_round=max_rounds, evals=[(dvalid, "valid")],
+                            early_stopping_rounds=early_stopping_rounds, verbose_eval=False, callbacks=[deadline_callback(deadline)])
+        # A fold cut short by the deadline has no comparable score, the candidate is dropped
+        if time.time() > deadline:
+            return None
+        scores.append(booster.best_score)
+        rounds.append(booster.best_iteration + 1)
+    return {"params": params, "rmse": float(np.mean(scores)), "rounds": int(np.mean(rounds))}
+
+
+def tune(X, y, baseline_params=None, n_candidates=40, n_folds=4, max_rounds=600, time_budget=1800, max_workers=None, seed=0):
+    # Candidates run across a process pool until they are exhausted or the budget runs out. At the deadline queued
+    # candidates are cancelled and running ones stop boosting within a round, then they are dropped
+    max_workers = max_workers or os.cpu_count() or 1
+    nthread = max(1, (os.cpu_count() or 1) // max_workers)
+    deadline = time.time() + time_budget
+
+    candidates = list(ParameterSampler(search_space, n_iter=n_candidates, random_state=seed))
+    candidates = [{k: v.item() if isinstance(v, np.generic) else v for k, v in c.items()} for c in candidates]
+    if baseline_params is not None:
+        candidates.insert(0, {k: v for k, v in baseline_params.items() if k in search_space})
+
+    results = []
+    X = np.ascontiguousarray(X, dtype="float32")
+    y = np.ascontiguousarray(y, dtype="float32")
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(X, y, n_folds)) as executor:
+        pending = set()
+        queue = iter(candidates)
+        while True:
+            # Keep one candidate queued per worker so nothing is committed past the deadline
+            while len(pending) < max_workers and time.time() < deadline:
+                params = next(queue, None)
+                if params is None:
+                    break
+                pending.add(executor.submit(evaluate_candidate, params, max_rounds, nthread, deadline))
+            if not pending:
+                break
+
+            done, pending = wait(pending, timeout=max(0, deadline - time.time()), return_when=FIRST_COMPLETED)
+            results.extend(result for result in (future.result() for future in done) if result is not None)
+            if time.time() >= deadline:
+                executor.shutdown(wait=True, cancel_futures=True)
+                break
+
+    if not results:
+        raise RuntimeError("No candidate finished within the tuning budget")
+    results.sort(key=lambda result: result["rmse"])
+    best = results[0]
+    return {**best["params"], "n_estimators": best["rounds"]}, results
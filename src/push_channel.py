@@ -0,0 +1,81 @@
+# Importing Libraries
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Version Push over Server Sent Events
+# One watcher thread per worker checks the published versions, every open stream waits on it
+# and only writes to its client when a version changes, plus a comment line as a keepalive.
+# A stream holds a server thread for as long as its client stays, at most max_streams are open per worker
+class VersionBroadcaster:
+    def __init__(self, sources, check_interval=1.0, heartbeat=15, max_streams=8):
+        self.sources = sources
+        self.check_interval = check_interval
+        self.heartbeat = heartbeat
+        self.max_streams = max_streams
+
+        self.versions = {}
+        self.sequence = 0
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._stream_slots = threading.BoundedSemaphore(max_streams)
+        self._thread = None
+
+    def check(self):
+        versions = {name: source() for name, source in self.sources.items()}
+        if versions == self.versions:
+            return False
+        with self._condition:
+            self.versions = versions
+            self.sequence += 1
+            self._condition.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Version check failed")
+            if self._stop_event.wait(self.check_interval):
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="version-broadcaster", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, sequence, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence != sequence or self._stop_event.is_set(), timeout)
+            return self.sequence, self.versions
+
+    def reserve_stream(self):
+        return self._stream_slots.acquire(blocking=False)
+
+    def release_stream(self):
+        self._stream_slots.release()
+
+    def stream(self):
+        # The current versions go out on connect, so a client that reconnects catches up at once
+        sequence, versions = self.sequence, self.versions
+        yield f"retry: 5000\nid: {sequence}\nevent: versions\ndata: {json.dumps(versions)}\n\n"
+        while not self._stop_event.is_set():
+            new_sequence, versions = self.wait(sequence, self.heartbeat)
+            if new_sequence == sequence:
+                yield ": keepalive\n\n"
+                continue
+            sequence = new_sequence
+            yield f"id: {sequence}\nevent: versions\ndata: {json.dumps(versions)}\n\n"
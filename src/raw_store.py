@@ -0,0 +1,175 @@
+# Importing Libraries
+import os, io, re
+import argparse
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import s3fs
+import pytz
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metrics import timed, add_observer, log_observer
+from storage_config import raw_data_path, city_registry, load_cities
+from storage_config import aws_region, aws_access_key_id, aws_secret_access_key
+
+# Compacted Layout
+# A closed date= partition is rewritten as part-NNNNN files sorted by time, named so they sort after the
+# output_HH_MM_SS objects they replace, a reader checkpointed on an output key still lists them
+part_prefix = "part-"
+part_rows = 1_000_000
+# 72 readings are six hours at the 5 minute schedule, a city-day holds several row groups to prune
+row_group_rows = int(os.environ.get("RAW_ROW_GROUP_ROWS", 72))
+raw_timezone = pytz.timezone("Asia/Kolkata")
+io_threads = 16
+
+
+def s3_clients():
+    fs = s3fs.S3FileSystem(key=aws_access_key_id, secret=aws_secret_access_key, client_kwargs={"region_name": aws_region})
+    s3_client = boto3.client("s3", region_name=aws_region, aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key)
+    return fs, s3_client
+
+
+def partition_prefix(city_name, day=None):
+    prefix = "/".join(raw_data_path.split("/")[3:]) + f"/city={city_name}/"
+    return prefix if day is None else f"{prefix}date={day}/"
+
+
+def list_keys(s3_client, prefix):
+    bucket_name = raw_data_path.split("/")[2]
+    keys = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".parquet"))
+    return time_order(keys)
+
+
+def time_order(keys):
+    # Part files hold what was compacted before, any output_ object beside them was written after it
+    return sorted(keys, key=lambda key: (not key.rsplit("/", 1)[1].startswith(part_prefix), key))
+
+
+def list_days(s3_client, city_name):
+    bucket_name = raw_data_path.split("/")[2]
+    days = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=partition_prefix(city_name), Delimiter="/"):
+        days.extend(re.search(r"date=([0-9-]+)", p["Prefix"]).group(1) for p in page.get("CommonPrefixes", []))
+    return sorted(days)
+
+
+# Compaction
+def read_object(s3_client, key):
+    response = s3_client.get_object(Bucket=raw_data_path.split("/")[2], Key=key)
+    return pd.read_parquet(io.BytesIO(response["Body"].read()), engine="pyarrow")
+
+
+@timed("compaction.partition")
+def compact_partition(s3_client, city_name, day, dry_run=False):
+    bucket_name = raw_data_path.split("/")[2]
+    prefix = partition_prefix(city_name, day)
+    keys = list_keys(s3_client, prefix)
+    if not keys or all(key.rsplit("/", 1)[1].startswith(part_prefix) for key in keys):
+        return city_name, day, len(keys), 0
+
+    # Keys are listed part files first, so a later output object wins over the compacted reading it revises
+    with ThreadPoolExecutor(max_workers=io_threads) as executor:
+        frames = list(executor.map(lambda key: read_object(s3_client, key), keys))
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates("timestamp", keep="last").sort_values("timestamp").reset_index(drop=True)
+    if dry_run:
+        return city_name, day, len(keys), len(df)
+
+    # Parts are written before anything is deleted, a crash in between leaves duplicates readers already drop
+    part_keys = []
+    for number, start in enumerate(range(0, len(df), part_rows)):
+        buffer = io.BytesIO()
+        table = pa.Table.from_pandas(df.iloc[start:start + part_rows], preserve_index=False)
+        pq.write_table(table, buffer, compression="snappy", row_group_size=row_group_rows, write_statistics=True)
+        part_key = f"{prefix}{part_prefix}{number:05d}.snappy.parquet"
+        s3_client.put_object(Bucket=bucket_name, Key=part_key, Body=buffer.getvalue())
+        part_keys.append(part_key)
+
+    stale = [key for key in keys if key not in part_keys]
+    for start in range(0, len(stale), 1000):
+        s3_client.delete_objects(Bucket=bucket_name, Delete={"Objects": [{"Key": key} for key in stale[start:start + 1000]], "Quiet": True})
+    return city_name, day, len(keys), len(df)
+
+
+def compact(before=None, cities=None, max_workers=4, dry_run=False):
+    # Only closed partitions, today's is still being written to
+    before = before or datetime.now(raw_timezone).date()
+    _, s3_client = s3_clients()
+    city_names = cities or [city["city"] for city in load_cities(city_registry)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        days = [(city_name, day) for city_name, city_days in zip(city_names, executor.map(lambda c: list_days(s3_client, c), city_names))
+                for day in city_days if day < str(before)]
+        results = list(executor.map(lambda item: compact_partition(s3_client, item[0], item[1], dry_run), days))
+
+    for city_name, day, objects, rows in results:
+        if rows:
+            print(f"{city_name} {day}: {objects} objects, {rows} readings")
+    return results
+
+
+# Time Range Reads
+# Partitions outside the range are never listed, row groups whose timestamp statistics miss it are never fetched
+def localize(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize(raw_timezone) if timestamp.tzinfo is None else timestamp
+
+
+def row_group_overlaps(row_group, column_index, start, end):
+    statistics = row_group.column(column_index).statistics
+    if statistics is None or not statistics.has_min_max:
+        return True
+    return localize(statistics.max) >= start and localize(statistics.min) <= end
+
+
+def read_raw_file(fs, path, start, end, columns=None):
+    with fs.open(path, "rb") as f:
+        parquet_file = pq.ParquetFile(f)
+        column_index = parquet_file.schema_arrow.get_field_index("timestamp")
+        metadata = parquet_file.metadata
+        row_groups = [i for i in range(metadata.num_row_groups) if row_group_overlaps(metadata.row_group(i), column_index, start, end)]
+        if not row_groups:
+            return None
+        read_columns = None if columns is None else list(dict.fromkeys(["timestamp"] + list(columns)))
+        df = parquet_file.read_row_groups(row_groups, columns=read_columns).to_pandas()
+
+    timestamps = pd.to_datetime(df["timestamp"])
+    if timestamps.dt.tz is None:
+        timestamps = timestamps.dt.tz_localize(raw_timezone)
+    return df[(timestamps >= start) & (timestamps <= end)]
+
+
+@timed("read_raw_range")
+def read_raw_range(city_name, start, end, columns=None, fs=None, s3_client=None):
+    if fs is None or s3_client is None:
+        fs, s3_client = s3_clients()
+    start, end = localize(start), localize(end)
+    bucket_name = raw_data_path.split("/")[2]
+
+    first_day, last_day = start.astimezone(raw_timezone).date(), end.astimezone(raw_timezone).date()
+    days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    with ThreadPoolExecutor(max_workers=io_threads) as executor:
+        listed = executor.map(lambda day: [(day, key) for key in list_keys(s3_client, partition_prefix(city_name, day))], days)
+        files = [item for items in listed for item in items]
+        frames = list(executor.map(lambda item: (item, read_raw_file(fs, f"{bucket_name}/{item[1]}", start, end, columns)), files))
+
+    frames = [df.assign(city=city_name, date=str(day)) for (day, key), df in frames if df is not None and not df.empty]
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates("timestamp", keep="last").sort_values("timestamp").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge every closed raw date= partition into a few time sorted parquet files")
+    parser.add_argument("--before", type=date.fromisoformat, help="compact partitions before this date, defaults to today")
+    parser.add_argument("--cities", nargs="*", help="defaults to every city in the registry")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be merged without writing")
+    args = parser.parse_args()
+    add_observer(log_observer)
+
+    compact(args.before, args.cities, args.workers, args.dry_run)
@@ -0,0 +1,157 @@
+# Importing Libraries
+import os
+import time
+import fcntl
+import logging
+import threading
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+# Cross Worker Data Cache
+# One worker per host holds the refresher lock and writes the frame to a shared Arrow file,
+# every worker memory maps that file and only re-reads it when the file is replaced
+class SharedDataCache:
+    def __init__(self, loader, cache_dir, name="data", refresh_interval=60, version_source=None):
+        self.loader = loader
+        self.version_source = version_source
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f"{name}.arrow")
+        self.lock_path = os.path.join(cache_dir, f"{name}.lock")
+        self.refresh_interval = refresh_interval
+
+        self._current = (None, None, None)
+        self._peeked = (None, None)
+        self._written_version = None
+        self._lock_file = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Refresher side
+    def _try_lock(self):
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def write(self, df, version):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"data_version": str(version).encode()})
+
+        # Write then rename so readers never map a partially written file
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self.path)
+        self._written_version = version
+
+    def refresh(self):
+        # A cheap version check first, the loader only runs for a version not written yet
+        if self.version_source is not None:
+            version = self.version_source()
+            if version is None or version == self._written_version:
+                return False
+        df, version = self.loader()
+        if df is not None and version != self._written_version:
+            self.write(df, version)
+            return True
+        return False
+
+    def _run(self, refresh_first):
+        if not refresh_first and self._stop_event.wait(self.refresh_interval):
+            return
+        while True:
+            try:
+                if self._try_lock():
+                    self.refresh()
+            except Exception:
+                logger.exception("Shared data refresh failed")
+            if self._stop_event.wait(self.refresh_interval):
+                return
+
+    def start(self, wait=False, timeout=10):
+        # With wait the worker only returns once a version is published on this host, loading it itself when it
+        # holds the refresher lock, so requests never run the loader. Without, snapshot is empty until it lands.
+        # The lock holder never waits on itself, when its load published nothing the background refresher retries
+        if self._thread is not None:
+            return self
+        if wait:
+            holder = False
+            try:
+                holder = self._try_lock()
+                if holder:
+                    self.refresh()
+            except Exception:
+                logger.exception("Initial shared data load failed, retrying in background")
+            if not holder:
+                self.wait_published(timeout)
+
+        self._thread = threading.Thread(target=self._run, args=(not wait,), name="shared-data-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_published(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(self.path):
+            if time.monotonic() >= deadline or self._stop_event.is_set():
+                logger.warning("No %s published after %ss, serving without it", os.path.basename(self.path), timeout)
+                return False
+            time.sleep(0.1)
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Reader side
+    def _read(self):
+        source = pa.memory_map(self.path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        version = (table.schema.metadata or {}).get(b"data_version", b"").decode() or None
+        # Columns without gaps stay read only views of the mapped file, shared by every worker through the page cache
+        return table.to_pandas(split_blocks=True), version
+
+    def get(self):
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Nothing published on this host yet, the refresher publishes it
+            return None, None
+
+        mtime, df, version = self._current
+        if mtime != stat.st_mtime_ns:
+            df, version = self._read()
+            self._current = (stat.st_mtime_ns, df, version)
+        return df, version
+
+    def peek_version(self):
+        # Version of the published file from its schema alone, only re-read when the file is replaced
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        mtime, version = self._peeked
+        if mtime != stat.st_mtime_ns:
+            with pa.memory_map(self.path, "r") as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            version = metadata.get(b"data_version", b"").decode() or None
+            self._peeked = (stat.st_mtime_ns, version)
+        return version
+
+    @property
+    def version(self):
+        return self._current[2]
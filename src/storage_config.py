@@ -0,0 +1,29 @@
+# Importing Libraries
+import os
+import pandas as pd
+from dotenv import load_dotenv
+
+# Shared by the ingestion Lambda, the raw store and the batch jobs, so none of them imports another for its settings
+load_dotenv()
+
+# Credentials
+aws_region = "ap-south-1"
+for key, value in os.environ.items():
+    globals()[key.lower()] = value
+
+# s3 Location
+s3_path = "s3://github-projects-resume/Real_Time_Analytical_Dashboard"
+raw_data_path = f"{s3_path}/data/raw"
+final_data_path = f"{s3_path}/data/final"
+working_data_path = f"{s3_path}/data/working"
+history_file = f"{working_data_path}/history.snappy.parquet"
+manifest_file = f"{working_data_path}/manifest.json"
+aggregator_file = f"{working_data_path}/aggregator_state.json"
+pollutant_breakpoints = f"{s3_path}/resources/aqi_concentration_breakpoints.csv"
+city_registry = f"{s3_path}/resources/cities.csv"
+
+# Tracked Cities, readings stored before the per city layout are all the default city's
+default_city = "chandigarh"
+
+def load_cities(path):
+    return pd.read_csv(path).to_dict("records")
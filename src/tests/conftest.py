@@ -0,0 +1,52 @@
+# Importing Libraries
+import os, sys
+import pytest
+
+# Every module reads its settings from the environment at import, so they are set before any is imported
+src_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, src_folder)
+sys.path.insert(0, os.path.join(src_folder, "benchmarks"))
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "ap-south-1",
+    "GOOGLE_API_KEY": "testing",
+    "WEATHER_API_KEY": "testing",
+    "METRICS_ENABLED": "false"
+})
+
+import bench_fixtures as fixtures
+from stub_http import StubServer, Reply, json_reply, fixture_page, cities, air_quality, weather
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sources(stub_server, monkeypatch):
+    # Every source points at the local stub, all of them answering by default
+    import aqi_fetch_data
+    monkeypatch.setattr(aqi_fetch_data, "aqi_in_url", f"{stub_server.url}/aqi_in")
+    monkeypatch.setattr(aqi_fetch_data, "aqi_us_url", f"{stub_server.url}/aqi_us")
+    monkeypatch.setattr(aqi_fetch_data, "weather_url", f"{stub_server.url}/weather")
+    monkeypatch.setattr(aqi_fetch_data, "aqi_us_validators", {})
+
+    stub_server.route("/aqi_in", json_reply(air_quality))
+    stub_server.route("/weather", json_reply(weather))
+    for city in cities:
+        stub_server.route(f"/aqi_us/{city['aqi_us_path']}", Reply(200, fixture_page("aqi_us_chandigarh.html")))
+    return stub_server
+
+
+# Local s3
+# The benchmarks' moto server on localhost, boto3 and s3fs clients reach it through AWS_ENDPOINT_URL
+@pytest.fixture(scope="session")
+def local_s3():
+    server = fixtures.start_local_s3()
+    yield os.environ["AWS_ENDPOINT_URL"]
+    del os.environ["AWS_ENDPOINT_URL"]
+    server.stop()
@@ -0,0 +1,109 @@
+# Importing Libraries
+import os
+import json
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+fixtures_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+# Source Payloads
+# Two cities and the answers the Air Quality and weather APIs give for them
+cities = [
+    {"city": "chandigarh", "name": "Chandigarh", "latitude": 30.7333, "longitude": 76.7794, "aqi_us_path": "india/chandigarh/chandigarh", "weather_query": "Chandigarh"},
+    {"city": "delhi", "name": "Delhi", "latitude": 28.6139, "longitude": 77.209, "aqi_us_path": "india/delhi/new-delhi", "weather_query": "Delhi"}
+]
+
+air_quality = {
+    "dateTime": "2026-10-18T04:00:00Z",
+    "pollutants": [
+        {"code": "pm25", "concentration": {"value": 64.2, "units": "MICROGRAMS_PER_CUBIC_METER"}},
+        {"code": "pm10", "concentration": {"value": 112.5, "units": "MICROGRAMS_PER_CUBIC_METER"}},
+        {"code": "no2", "concentration": {"value": 18.4, "units": "PARTS_PER_BILLION"}},
+        {"code": "so2", "concentration": {"value": 3.1, "units": "PARTS_PER_BILLION"}},
+        {"code": "co", "concentration": {"value": 780.0, "units": "PARTS_PER_BILLION"}},
+        {"code": "o3", "concentration": {"value": 22.7, "units": "PARTS_PER_BILLION"}}
+    ]
+}
+weather = {"current": {"temp_c": 27.4, "humidity": 58, "uv": 3.2, "wind_kph": 9.1, "wind_degree": 250}}
+
+
+def fixture_page(name):
+    with open(os.path.join(fixtures_folder, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# Local HTTP Stub
+# Replies are served in order per path, the last one repeats, a callable reply is given the request to pick one.
+# delay holds the reply back before the headers, body_delay after them, so both slow responses and slow bodies can be exercised
+Reply = namedtuple("Reply", ["status", "body", "headers", "delay", "body_delay"], defaults=[200, b"", {}, 0, 0])
+
+
+def json_reply(payload, **kwargs):
+    return Reply(body=json.dumps(payload), headers={"Content-Type": "application/json"}, **kwargs)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.stub.handle(self)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def route(self, path, *replies):
+        self.routes[path] = list(replies)
+
+    def requests_to(self, path):
+        return [request for request in self.requests if request["path"] == path]
+
+    def handle(self, handler):
+        path = handler.path.split("?")[0]
+        # The client's port tells connections apart, a reused keep-alive connection keeps its port
+        request = {"method": handler.command, "path": path, "peer": handler.client_address[1], "headers": dict(handler.headers),
+                   "body": handler.rfile.read(int(handler.headers.get("Content-Length") or 0))}
+        with self._lock:
+            self.requests.append(request)
+            replies = self.routes.get(path) or [Reply(404)]
+            reply = replies.pop(0) if len(replies) > 1 else replies[0]
+        if callable(reply):
+            reply = reply(request)
+
+        body = reply.body.encode("utf-8") if isinstance(reply.body, str) else reply.body
+        try:
+            self._stopping.wait(reply.delay)
+            handler.send_response(reply.status)
+            for key, value in reply.headers.items():
+                handler.send_header(key, value)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.flush()
+            self._stopping.wait(reply.body_delay)
+            handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), name="stub-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,134 @@
+# Importing Libraries
+import time
+import pytest
+import aqi_fetch_data
+from aqi_fetch_data import AQIValueParser, parse_aqi_us, get_aqi_us
+from stub_http import Reply, fixture_page
+
+city = {"city": "chandigarh", "aqi_us_path": "india/chandigarh/chandigarh"}
+page_path = "/in/dashboard/india/chandigarh/chandigarh"
+
+recorded_pages = [
+    ("aqi_us_chandigarh.html", 156),
+    ("aqi_us_value_after_label.html", 318),
+    ("aqi_us_no_data.html", None),
+    ("aqi_us_not_found.html", None)
+]
+
+
+@pytest.fixture
+def aqi_us_server(stub_server, monkeypatch):
+    monkeypatch.setattr(aqi_fetch_data, "aqi_us_url", f"{stub_server.url}/in/dashboard")
+    monkeypatch.setattr(aqi_fetch_data, "aqi_us_validators", {})
+    return stub_server
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Backoff delays at their upper bound, recorded instead of slept
+    recorded = []
+    monkeypatch.setattr(aqi_fetch_data.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(aqi_fetch_data.time, "sleep", recorded.append)
+    return recorded
+
+
+# Parsing
+@pytest.mark.parametrize("name, expected", recorded_pages)
+def test_parse_recorded_page(name, expected):
+    assert parse_aqi_us([fixture_page(name)]) == expected
+
+
+@pytest.mark.parametrize("name, expected", recorded_pages)
+def test_parse_page_split_across_chunks(name, expected):
+    page = fixture_page(name)
+    assert parse_aqi_us(page[i:i + 7] for i in range(0, len(page), 7)) == expected
+
+
+def test_parse_stops_after_value_block():
+    page = fixture_page("aqi_us_chandigarh.html")
+    chunks = [page[i:i + 64] for i in range(0, len(page), 64)]
+    consumed = []
+    assert parse_aqi_us(consumed.append(chunk) or chunk for chunk in chunks) == 156
+    assert len(consumed) < len(chunks)
+
+
+def test_parse_gives_up_past_deadline():
+    page = fixture_page("aqi_us_chandigarh.html")
+    chunks = [page[i:i + 64] for i in range(0, len(page), 64)]
+    assert parse_aqi_us(iter(chunks), deadline=time.monotonic() - 1) is None
+
+
+def test_parser_ignores_numbers_outside_value_block():
+    parser = AQIValueParser()
+    parser.feed('<div class="rank"><span>412</span></div><div class="aqi-value"><span>AQI</span><span>87</span></div><span>5</span>')
+    assert parser.value == 87 and parser.finished
+
+
+# Scraping
+def test_scrape_recorded_page(aqi_us_server):
+    aqi_us_server.route(page_path, Reply(200, fixture_page("aqi_us_chandigarh.html"), {"Content-Type": "text/html; charset=utf-8"}))
+    assert get_aqi_us(city, timeout=2) == 156
+
+
+@pytest.mark.parametrize("reply", [
+    Reply(200, fixture_page("aqi_us_no_data.html")),
+    Reply(200, fixture_page("aqi_us_not_found.html")),
+    Reply(404, fixture_page("aqi_us_not_found.html"))
+])
+def test_scrape_failure_falls_back_to_zero_without_retrying(aqi_us_server, sleeps, reply):
+    aqi_us_server.route(page_path, reply)
+    assert get_aqi_us(city, timeout=2) == 0
+    assert len(aqi_us_server.requests_to(page_path)) == 1
+    assert sleeps == []
+
+
+@pytest.mark.parametrize("validator, request_header", [("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since")])
+def test_not_modified_reuses_last_value(aqi_us_server, validator, request_header):
+    value = '"3f1c-156"' if validator == "ETag" else "Sat, 18 Oct 2026 04:35:00 GMT"
+    aqi_us_server.route(page_path, Reply(200, fixture_page("aqi_us_chandigarh.html"), {validator: value}), Reply(304, headers={validator: value}))
+
+    assert get_aqi_us(city, timeout=2) == 156
+    assert get_aqi_us(city, timeout=2) == 156
+    first, second = aqi_us_server.requests_to(page_path)
+    assert request_header not in first["headers"]
+    assert second["headers"][request_header] == value
+
+
+def test_page_without_validators_is_fetched_in_full_again(aqi_us_server):
+    aqi_us_server.route(page_path, Reply(200, fixture_page("aqi_us_chandigarh.html")))
+    assert get_aqi_us(city, timeout=2) == 156
+    assert get_aqi_us(city, timeout=2) == 156
+    assert all("If-None-Match" not in request["headers"] for request in aqi_us_server.requests_to(page_path))
+
+
+def test_retries_with_exponential_backoff(aqi_us_server, sleeps):
+    aqi_us_server.route(page_path, Reply(503), Reply(429), Reply(502), Reply(200, fixture_page("aqi_us_chandigarh.html")))
+    assert get_aqi_us(city, timeout=5) == 156
+    assert len(aqi_us_server.requests_to(page_path)) == 4
+    assert sleeps == [0.25, 0.5, 1.0]
+
+
+def test_backoff_is_capped(aqi_us_server, sleeps, monkeypatch):
+    monkeypatch.setitem(aqi_fetch_data.aqi_us_backoff, "cap", 0.6)
+    aqi_us_server.route(page_path, Reply(503), Reply(503), Reply(503), Reply(200, fixture_page("aqi_us_chandigarh.html")))
+    assert get_aqi_us(city, timeout=5) == 156
+    assert sleeps == [0.25, 0.5, 0.6]
+
+
+def test_retries_stop_at_deadline(aqi_us_server):
+    aqi_us_server.route(page_path, Reply(503))
+    start = time.monotonic()
+    assert get_aqi_us(city, timeout=1) == 0
+    assert time.monotonic() - start < 1.5
+    assert len(aqi_us_server.requests_to(page_path)) >= 2
+
+
+@pytest.mark.parametrize("reply", [
+    Reply(200, fixture_page("aqi_us_chandigarh.html"), delay=5),
+    Reply(200, fixture_page("aqi_us_chandigarh.html"), body_delay=5)
+])
+def test_slow_page_is_abandoned_at_deadline(aqi_us_server, reply):
+    aqi_us_server.route(page_path, reply)
+    start = time.monotonic()
+    assert get_aqi_us(city, timeout=1) == 0
+    assert time.monotonic() - start < 2
@@ -0,0 +1,90 @@
+# Importing Libraries
+import os
+import json
+import time
+import pytest
+import requests
+import aqi_fetch_data
+from aqi_engine import load_breakpoints
+from aqi_fetch_data import fetch_sources, fetch_cities, http_session
+from stub_http import Reply, json_reply, fixture_page, cities, air_quality, weather
+
+src_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+breakpoints = load_breakpoints(os.path.join(src_folder, "Data", "aqi_concentration_breakpoints.csv"))
+no_weather = (None, None, None, None, None)
+
+
+@pytest.fixture(autouse=True)
+def short_timeouts(monkeypatch):
+    for source in ["aqi_in", "aqi_us", "weather"]:
+        monkeypatch.setitem(aqi_fetch_data.source_timeouts, source, 0.5)
+
+
+def for_city(city_name, reply, other):
+    # The Air Quality API is one url for every city, the city is told apart by its coordinates
+    city = next(city for city in cities if city["city"] == city_name)
+    return lambda request: reply if json.loads(request["body"])["location"]["latitude"] == city["latitude"] else other
+
+
+def test_all_sources(sources):
+    aqi_in_values, aqi_us, weather_values = fetch_sources(breakpoints, cities[0])
+    assert aqi_in_values[0].isoformat() == "2026-10-18T09:30:00+05:30"
+    assert aqi_in_values[2:4] == (64.2, 112.5)
+    assert aqi_us == 156
+    assert weather_values == (27, 58, 3, 9, 250)
+
+
+@pytest.mark.parametrize("reply", [Reply(500), Reply(200, "not json"), json_reply(weather, delay=3)])
+def test_weather_failure_is_isolated(sources, reply):
+    sources.route("/weather", reply)
+    start = time.monotonic()
+    aqi_in_values, aqi_us, weather_values = fetch_sources(breakpoints, cities[0])
+    assert aqi_in_values[2] == 64.2 and aqi_us == 156
+    assert weather_values == no_weather
+    assert time.monotonic() - start < 1.5
+
+
+@pytest.mark.parametrize("reply", [Reply(404), Reply(200, fixture_page("aqi_us_no_data.html")), Reply(200, delay=3)])
+def test_aqi_us_failure_is_isolated(sources, reply):
+    sources.route(f"/aqi_us/{cities[0]['aqi_us_path']}", reply)
+    start = time.monotonic()
+    aqi_in_values, aqi_us, weather_values = fetch_sources(breakpoints, cities[0])
+    assert aqi_in_values[2] == 64.2 and weather_values == (27, 58, 3, 9, 250)
+    assert aqi_us == 0
+    assert time.monotonic() - start < 1.5
+
+
+def test_aqi_us_is_retried(sources):
+    path = f"/aqi_us/{cities[0]['aqi_us_path']}"
+    sources.route(path, Reply(503), Reply(200, fixture_page("aqi_us_chandigarh.html")))
+    assert fetch_sources(breakpoints, cities[0])[1] == 156
+    assert len(sources.requests_to(path)) == 2
+
+
+@pytest.mark.parametrize("reply, error", [(Reply(500), requests.HTTPError), (json_reply(air_quality, delay=3), requests.Timeout)])
+def test_reading_failure_fails_the_city(sources, reply, error):
+    sources.route("/aqi_in", reply)
+    start = time.monotonic()
+    with pytest.raises(error):
+        fetch_sources(breakpoints, cities[0])
+    assert time.monotonic() - start < 1.5
+
+
+@pytest.mark.parametrize("reply", [Reply(500), json_reply(air_quality, delay=3)])
+def test_failing_city_is_skipped(sources, reply):
+    sources.route("/aqi_in", for_city("delhi", reply, json_reply(air_quality)))
+    start = time.monotonic()
+    raw_dfs = fetch_cities(breakpoints, cities)
+    assert list(raw_dfs) == ["chandigarh"]
+    assert raw_dfs["chandigarh"].iloc[0]["aqi_us"] == 156
+    assert time.monotonic() - start < 1.5
+
+
+def test_shared_session_reuses_connections(sources):
+    # Every source of every city goes through the one session, no run has more than one request
+    # per source and city in flight, so pooled connections never exceed that across runs
+    for _ in range(3):
+        raw_dfs = fetch_cities(breakpoints, cities, session=http_session)
+        assert sorted(raw_dfs) == ["chandigarh", "delhi"]
+    assert len(sources.requests) == 18
+    assert len({request["peer"] for request in sources.requests}) <= 3 * len(cities)
@@ -0,0 +1,99 @@
+# Importing Libraries
+import time
+import boto3
+import s3fs
+import pandas as pd
+import pytest
+import bench_fixtures as fixtures
+import aqi_fetch_data
+from aqi_fetch_data import lambda_handler, read_manifest, write_manifest, check_consistency
+from final_store import FinalReader
+from stub_http import Reply, json_reply, cities, air_quality
+
+# A run is scheduled every few minutes and has to finish well inside its slot
+run_budget = 10
+bucket_name = aqi_fetch_data.s3_path.split("/")[2]
+
+
+@pytest.fixture
+def s3_bucket(local_s3):
+    s3_client = boto3.client("s3", region_name=aqi_fetch_data.aws_region)
+    fixtures.create_bucket(s3_client)
+    fixtures.seed_resources(s3_client, cities)
+    yield s3_client
+
+    # s3fs keeps listings per filesystem instance, a later test must not see this bucket's
+    s3fs.S3FileSystem.clear_instance_cache()
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name):
+        for obj in page.get("Contents", []):
+            s3_client.delete_object(Bucket=bucket_name, Key=obj["Key"])
+    s3_client.delete_bucket(Bucket=bucket_name)
+
+
+def timed_run():
+    start = time.monotonic()
+    result = lambda_handler()
+    return result, time.monotonic() - start
+
+
+def read_final():
+    return FinalReader(aqi_fetch_data.final_data_path, s3_client_kwargs={"region_name": aqi_fetch_data.aws_region}).read()
+
+
+def test_first_run_within_budget(sources, s3_bucket):
+    result, elapsed = timed_run()
+    assert result["statusCode"] == 200
+    assert elapsed < run_budget
+
+    # Raw objects per city, checkpoints for both and the final layer, consistent with what was fetched
+    assert sorted(read_manifest(s3_bucket)["last_keys"]) == ["chandigarh", "delhi"]
+    df = read_final()
+    assert sorted(df["city"]) == ["chandigarh", "delhi"]
+    assert (df["aqi_us"] == 156).all() and (df["temperature"] == 27).all()
+    assert df["aqi_24"].notna().all()
+
+
+def test_incremental_run_within_budget(sources, s3_bucket):
+    assert timed_run()[1] < run_budget
+
+    # The next reading an hour later is folded into the working set from the checkpoint
+    sources.route("/aqi_in", json_reply({**air_quality, "dateTime": "2026-10-18T05:00:00Z"}))
+    result, elapsed = timed_run()
+    assert result["statusCode"] == 200
+    assert elapsed < run_budget
+
+    df = read_final()
+    assert df.groupby("city").size().to_dict() == {"chandigarh": 2, "delhi": 2}
+
+
+def test_run_without_readings(sources, s3_bucket):
+    # Nothing fetched and nothing stored yet, the run ends without publishing
+    sources.route("/aqi_in", Reply(500))
+    result, elapsed = timed_run()
+    assert result["statusCode"] == 200
+    assert elapsed < run_budget
+    assert read_final() is None
+
+
+def test_first_run_folds_in_legacy_raw_objects(sources, s3_bucket):
+    # Readings stored before per city partitions, under raw/date= for the default city
+    legacy_df = pd.DataFrame([{"timestamp": pd.Timestamp("2026-10-18 03:00:00", tz="Asia/Kolkata"), "aqi_in": 90, "aqi_us": 120}])
+    day = aqi_fetch_data.working_window_start()
+    raw_prefix = "/".join(aqi_fetch_data.raw_data_path.split("/")[3:])
+    s3_bucket.put_object(Bucket=bucket_name, Key=f"{raw_prefix}/date={day}/output_03_00_00.snappy.parquet", Body=legacy_df.to_parquet(index=False))
+
+    assert timed_run()[0]["statusCode"] == 200
+    df = read_final()
+    assert df.groupby("city").size().to_dict() == {"chandigarh": 2, "delhi": 1}
+    assert (df["aqi_in"] == 90).sum() == 1
+
+
+def test_consistency_check_catches_a_lost_checkpoint(sources, s3_bucket):
+    assert timed_run()[0]["statusCode"] == 200
+    raw_keys = read_manifest(s3_bucket)["last_keys"]
+    assert check_consistency(s3_bucket, raw_keys)
+
+    # A concurrent run that replaced the manifest with an older one leaves this run's objects unaccounted for
+    write_manifest(s3_bucket, {"last_keys": {"chandigarh": raw_keys["chandigarh"]}, "window_start": None})
+    with pytest.raises(RuntimeError, match="delhi"):
+        check_consistency(s3_bucket, raw_keys)
@@ -0,0 +1,63 @@
+# Importing Libraries
+import time
+import pandas as pd
+
+from shared_cache import SharedDataCache
+
+
+# Loaders
+class Loader:
+    # Publishes nothing until a frame is handed to it, like a bucket with no latest.json yet
+    def __init__(self):
+        self.calls = 0
+        self.df = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.df is None:
+            return None, None
+        return self.df, "v1"
+
+
+# Cold Start
+def test_holder_starts_at_once_with_nothing_published(tmp_path):
+    loader = Loader()
+    started = time.monotonic()
+    cache = SharedDataCache(loader, str(tmp_path), refresh_interval=60).start(wait=True, timeout=30)
+    try:
+        assert time.monotonic() - started < 2
+        assert loader.calls == 1
+        assert cache.snapshot() == (None, None)
+        assert cache.peek_version() is None
+    finally:
+        cache.stop()
+
+
+def test_waiting_worker_gives_up_at_its_timeout(tmp_path):
+    holder = SharedDataCache(Loader(), str(tmp_path), refresh_interval=60).start(wait=True)
+    loader = Loader()
+    started = time.monotonic()
+    worker = SharedDataCache(loader, str(tmp_path), refresh_interval=60).start(wait=True, timeout=0.5)
+    try:
+        assert 0.5 <= time.monotonic() - started < 2
+        # Only the lock holder ever runs the loader
+        assert loader.calls == 0
+        assert worker.snapshot() == (None, None)
+    finally:
+        worker.stop()
+        holder.stop()
+
+
+def test_first_version_is_picked_up_once_published(tmp_path):
+    loader = Loader()
+    holder = SharedDataCache(loader, str(tmp_path), refresh_interval=0.1).start(wait=True)
+    worker = SharedDataCache(Loader(), str(tmp_path), refresh_interval=60).start(wait=True, timeout=0.1)
+    try:
+        loader.df = pd.DataFrame({"city": ["chandigarh"], "aqi": [42]})
+        assert worker.wait_published(5)
+        df, version = worker.snapshot()
+        assert version == "v1"
+        assert df["aqi"].tolist() == [42]
+    finally:
+        worker.stop()
+        holder.stop()